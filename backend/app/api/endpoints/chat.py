@@ -1,69 +1,121 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import Text, cast, delete, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Set
+from datetime import datetime
+import asyncio
 import json
 
-from app.core.database import get_db, ChatSession, ChatMessage
+import orjson
+
+from app.api.pagination import decode_cursor, set_next_cursor, split_page
+from app.core.database import get_async_db, AsyncSessionLocal, ChatSession, ChatMessage, ChatSessionSummary
 from app.models.schemas import (
     ChatSessionCreate, ChatSessionResponse,
     ChatMessageCreate, ChatMessageResponse
 )
+from app.core.services import get_chat_service
+from app.core.timing import stage
 from app.services.langchain_chat_service import LangChainChatService
 
 router = APIRouter()
 
+# Replies still being saved after their stream was cancelled
+_saving: Set[asyncio.Task] = set()
+
 @router.post("/chat/sessions", response_model=ChatSessionResponse)
 async def create_chat_session(
     session_data: ChatSessionCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new chat session"""
     db_session = ChatSession(title=session_data.title)
     db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
+    await db.commit()
     return db_session
 
 @router.get("/chat/sessions", response_model=List[ChatSessionResponse])
 async def list_chat_sessions(
-    page: int = 1,
-    page_size: int = 20,
-    db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = None,
+    page_size: int = Query(20, ge=1, le=100),
+    page: Optional[int] = Query(None, ge=1, deprecated=True),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List chat sessions with pagination"""
-    offset = (page - 1) * page_size
-    return db.query(ChatSession).order_by(
-        ChatSession.created_at.desc()
-    ).offset(offset).limit(page_size).all()
+    """List chat sessions, newest first.
+    
+    Pages are keyset-paginated: the `X-Next-Cursor` response header is the
+    `cursor` for the next page and is absent on the last one. `page` is the
+    old OFFSET pagination, which gets slower the deeper the page.
+    """
+    query = select(ChatSession).order_by(ChatSession.created_at.desc(), ChatSession.id.desc())
+    if cursor:
+        query = query.where(tuple_(ChatSession.created_at, ChatSession.id) < decode_cursor(cursor))
+    elif page:
+        query = query.offset((page - 1) * page_size)
+    result = await db.execute(query.limit(page_size + 1))
+    return set_next_cursor(response, result.scalars().all(), page_size)
 
 @router.get("/chat/sessions/{session_id}/messages", response_model=List[ChatMessageResponse])
-async def get_chat_messages(session_id: int, db: Session = Depends(get_db)):
-    """Get messages for a specific chat session"""
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.session_id == session_id
-    ).order_by(ChatMessage.created_at).all()
+async def get_chat_messages(
+    session_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the latest messages of a chat session, oldest first.
     
-    # Parse sources JSON
-    for message in messages:
-        if message.sources:
-            try:
-                message.sources = json.loads(message.sources)
-            except:
-                message.sources = None
+    The `X-Next-Cursor` response header is the `cursor` for the page of
+    earlier messages and is absent once the start of the session is reached.
+    """
+    # Plain rows rather than ORM objects, with sources as the JSON text the
+    # database holds: it is spliced into the response as is, never parsed
+    query = (
+        select(
+            ChatMessage.id,
+            ChatMessage.session_id,
+            ChatMessage.role,
+            ChatMessage.content,
+            cast(ChatMessage.sources, Text).label("sources"),
+            ChatMessage.created_at
+        )
+        .where(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+    )
+    if cursor:
+        query = query.where(tuple_(ChatMessage.created_at, ChatMessage.id) < decode_cursor(cursor))
+    result = await db.execute(query.limit(limit + 1))
+    rows, headers = split_page(result.all(), limit)
     
-    return messages
+    # Fetched newest first so the page ends at the cursor; shown oldest first.
+    # Returned as a response directly, so FastAPI skips validating the rows.
+    return ORJSONResponse(
+        [
+            {
+                "id": row.id,
+                "session_id": row.session_id,
+                "role": row.role,
+                "content": row.content,
+                "sources": orjson.Fragment(row.sources) if row.sources else None,
+                "created_at": row.created_at
+            }
+            for row in reversed(rows)
+        ],
+        headers=headers
+    )
 
 @router.post("/chat/sessions/{session_id}/messages", response_model=ChatMessageResponse)
 async def send_message(
     session_id: int,
     message_data: ChatMessageCreate,
-    db: Session = Depends(get_db),
-    chat_service: LangChainChatService = Depends(LangChainChatService)
+    db: AsyncSession = Depends(get_async_db),
+    chat_service: LangChainChatService = Depends(get_chat_service)
 ):
     """Send a message and get AI response"""
     
     # Verify session exists
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    session = await db.get(ChatSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
     
@@ -75,47 +127,156 @@ async def send_message(
             content=message_data.content
         )
         db.add(user_message)
-        db.commit()
-        db.refresh(user_message)
+        with stage("db"):
+            await db.commit()
         
-        # Get AI response with RAG
-        ai_response, sources = await chat_service.get_response(message_data.content)
+        # Get AI response with RAG, in the context of the earlier turns
+        conversation = await chat_service.load_conversation(db, session_id, user_message.id)
+        ai_response, sources = await chat_service.get_response(message_data.content, conversation)
         
         # Save AI response
         assistant_message = ChatMessage(
             session_id=session_id,
             role="assistant",
             content=ai_response,
-            sources=json.dumps([source.dict() for source in sources]) if sources else None
+            sources=[source.model_dump() for source in sources] or None
         )
         db.add(assistant_message)
         
         # Update session timestamp
-        session.updated_at = assistant_message.created_at
+        session.updated_at = datetime.utcnow()
         
-        db.commit()
-        db.refresh(assistant_message)
+        with stage("db"):
+            await db.commit()
         
-        # Prepare response
-        assistant_message.sources = sources
         return assistant_message
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
+@router.post("/chat/sessions/{session_id}/messages/stream")
+async def send_message_stream(
+    session_id: int,
+    message_data: ChatMessageCreate,
+    db: AsyncSession = Depends(get_async_db),
+    chat_service: LangChainChatService = Depends(get_chat_service)
+):
+    """Send a message and stream the AI response as Server-Sent Events.
+    
+    Events: `sources` (list of source references), `token` (one per generated
+    token), then `done` with the saved assistant message, or `error`.
+    """
+    
+    # Verify session exists
+    session = await db.get(ChatSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    
+    # Save user message
+    user_message = ChatMessage(
+        session_id=session_id,
+        role="user",
+        content=message_data.content
+    )
+    db.add(user_message)
+    with stage("db"):
+        await db.commit()
+    
+    # Read the earlier turns while the request's session is still open
+    conversation = await chat_service.load_conversation(db, session_id, user_message.id)
+    
+    async def event_stream():
+        sources = []
+        tokens = []
+        failed = False
+        try:
+            async for kind, payload in chat_service.stream_response(message_data.content, conversation):
+                if kind == "sources":
+                    sources = payload
+                    yield _sse("sources", [source.model_dump() for source in sources])
+                else:
+                    tokens.append(payload)
+                    yield _sse("token", {"token": payload})
+        except Exception as e:
+            failed = True
+            yield _sse("error", {"detail": f"Error processing message: {str(e)}"})
+            return
+        finally:
+            # Save the answer even if the client went away mid-stream, or the
+            # question would be left unanswered in the history. The save runs
+            # as its own task so cancelling the response doesn't stop it.
+            if not failed:
+                save = asyncio.create_task(_save_reply(session_id, "".join(tokens), sources))
+                _saving.add(save)
+                save.add_done_callback(_saving.discard)
+        
+        try:
+            response = await asyncio.shield(save)
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error saving message: {str(e)}"})
+            return
+        yield _sse("done", response.model_dump(mode="json"))
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Don't let proxies buffer the stream
+        }
+    )
+
+async def _save_reply(session_id: int, content: str, sources: list) -> ChatMessageResponse:
+    """Save a streamed answer. The request's session may already be closed, so use a fresh one."""
+    async with AsyncSessionLocal() as db:
+        try:
+            assistant_message = ChatMessage(
+                session_id=session_id,
+                role="assistant",
+                content=content,
+                sources=[source.model_dump() for source in sources] or None
+            )
+            db.add(assistant_message)
+            await db.execute(
+                update(ChatSession).where(ChatSession.id == session_id).values(updated_at=datetime.utcnow())
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+    
+    return ChatMessageResponse(
+        id=assistant_message.id,
+        session_id=assistant_message.session_id,
+        role=assistant_message.role,
+        content=assistant_message.content,
+        sources=sources or None,
+        created_at=assistant_message.created_at
+    )
+
+def _sse(event: str, data) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @router.delete("/chat/sessions/{session_id}")
-async def delete_chat_session(session_id: int, db: Session = Depends(get_db)):
+async def delete_chat_session(
+    session_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    chat_service: LangChainChatService = Depends(get_chat_service)
+):
     """Delete a chat session and all its messages"""
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    session = await db.get(ChatSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
     
-    # Delete messages first
-    db.query(ChatMessage).filter(ChatMessage.session_id == session_id).delete()
+    # Delete messages and the conversation summary first
+    await db.execute(delete(ChatMessage).where(ChatMessage.session_id == session_id))
+    await db.execute(delete(ChatSessionSummary).where(ChatSessionSummary.session_id == session_id))
     
     # Delete session
-    db.delete(session)
-    db.commit()
+    await db.delete(session)
+    await db.commit()
+    chat_service.forget_conversation(session_id)
     
     return {"message": "Chat session deleted successfully"}
\ No newline at end of file
@@ -1,105 +1,295 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from fastapi.responses import FileResponse
-from typing import List
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 import os
-import aiofiles
-from datetime import datetime
-import fitz  # PyMuPDF
 
+from app.api.pagination import decode_cursor, set_next_cursor
 from app.core.config import settings
-from app.models.schemas import DocumentUploadResponse, DocumentListResponse
+from app.core.database import DocumentRecord, get_async_db
+from app.models.schemas import (
+    DocumentUploadResponse, DocumentListResponse, IngestionJobResponse, BulkIngestionJobResponse,
+    DocumentBulkDeleteRequest, DocumentBulkDeleteResponse
+)
+from app.core.services import ServiceRegistry, get_document_service, get_ingestion_jobs, get_services
+from app.services.ingestion_jobs import BulkIngestionJob, IngestionJob, IngestionJobManager
 from app.services.langchain_document_service import LangChainDocumentService
+from app.services.upload_storage import InvalidUploadError, UploadTooLargeError, receive_uploads
 
 router = APIRouter()
 
-@router.post("/documents/upload", response_model=DocumentUploadResponse)
+def _multipart_body(field_name: str, many: bool) -> dict:
+    """OpenAPI request body for endpoints that read the multipart stream themselves"""
+    schema = {"type": "string", "format": "binary"}
+    if many:
+        schema = {"type": "array", "items": schema}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {"type": "object", "properties": {field_name: schema}, "required": [field_name]}
+                }
+            }
+        }
+    }
+
+def _accept_document(filename: str):
+    """Refuse anything but PDF and TXT files before their data is written"""
+    if not filename.lower().endswith(('.pdf', '.txt')):
+        raise HTTPException(status_code=400, detail=f"Only PDF and TXT files are allowed: {filename}")
+
+@router.post(
+    "/documents/upload",
+    response_model=DocumentUploadResponse,
+    status_code=202,
+    openapi_extra=_multipart_body("file", many=False)
+)
 async def upload_document(
-    file: UploadFile = File(...),
-    doc_service: LangChainDocumentService = Depends(LangChainDocumentService)
+    request: Request,
+    ingestion_jobs: IngestionJobManager = Depends(get_ingestion_jobs)
 ):
-    """Upload and process a document (PDF or TXT)"""
+    """Upload a document (PDF or TXT) and queue it for indexing.
     
-    # Validate file type
-    filename_lower = file.filename.lower()
-    if not (filename_lower.endswith('.pdf') or filename_lower.endswith('.txt')):
-        raise HTTPException(status_code=400, detail="Only PDF and TXT files are allowed")
-    
-    # Validate file size
-    file_size_mb = len(await file.read()) / (1024 * 1024)
-    await file.seek(0)  # Reset file pointer
+    The file is streamed straight to disk, and refused with 413 as soon as
+    it exceeds the size limit. Returns immediately with a job id; poll
+    `/documents/jobs/{job_id}` for progress.
+    """
     
-    if file_size_mb > settings.max_file_size_mb:
+    # Stream to disk, enforcing the size limit and hashing along the way
+    try:
+        stored = await receive_uploads(request, "file", _accept_document, max_files=1)
+    except HTTPException:
+        raise
+    except UploadTooLargeError:
         raise HTTPException(
-            status_code=400, 
+            status_code=413, 
             detail=f"File size exceeds {settings.max_file_size_mb}MB limit"
         )
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error saving document: {str(e)}")
+    if not stored:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    stored = stored[0]
+    
+    # Parsing, chunking and embedding run in the background
+    job = ingestion_jobs.submit(
+        stored.path,
+        stored.filename,
+        content_hash=stored.sha256,
+        size_bytes=stored.size_bytes,
+        upload_path=stored.temp_path
+    )
     
-    # Save file
-    file_path = os.path.join(settings.upload_dir, file.filename)
+    return DocumentUploadResponse(
+        filename=stored.filename,
+        message="Document uploaded. Indexing in progress.",
+        job_id=job.id,
+        status=job.status
+    )
+
+@router.post(
+    "/documents/upload/bulk",
+    response_model=BulkIngestionJobResponse,
+    status_code=202,
+    openapi_extra=_multipart_body("files", many=True)
+)
+async def upload_documents(
+    request: Request,
+    ingestion_jobs: IngestionJobManager = Depends(get_ingestion_jobs)
+):
+    """Upload many documents (PDF or TXT) and index them together.
     
+    Files are streamed straight to disk like single uploads. They go through
+    one bulk ingestion pipeline, which keeps every core busy across files.
+    Returns immediately; poll `/documents/bulk-jobs/{job_id}` for per-file
+    progress and the throughput summary.
+    """
     try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        # Process document and get page count
-        if filename_lower.endswith('.pdf'):
-            # For PDF files, get page count with PyMuPDF
-            doc = fitz.open(file_path)
-            pages = len(doc)
-            doc.close()
-        else:
-            # For TXT files, treat as 1 page
-            pages = 1
-        
-        # Process document with LangChain
-        result = await doc_service.process_document(file_path, file.filename)
-        
-        return DocumentUploadResponse(
-            filename=result["filename"],
-            pages=result["pages"],
-            message=result["message"]
+        stored = await receive_uploads(
+            request, "files", _accept_document, max_files=settings.bulk_upload_max_files
         )
-        
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        # Clean up file on error
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error saving documents: {str(e)}")
+    if not stored:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    
+    return _bulk_job_response(ingestion_jobs.submit_bulk(stored))
+
+@router.get("/documents/bulk-jobs/{job_id}", response_model=BulkIngestionJobResponse)
+async def get_bulk_ingestion_job(
+    job_id: str,
+    ingestion_jobs: IngestionJobManager = Depends(get_ingestion_jobs)
+):
+    """Get the progress of a bulk ingestion and its throughput so far"""
+    bulk_job = ingestion_jobs.get_bulk(job_id)
+    if not bulk_job:
+        raise HTTPException(status_code=404, detail="Bulk ingestion job not found")
+    return _bulk_job_response(bulk_job)
+
+def _bulk_job_response(bulk_job: BulkIngestionJob) -> BulkIngestionJobResponse:
+    return BulkIngestionJobResponse(
+        job_id=bulk_job.id,
+        status=bulk_job.status,
+        files=[_job_response(job) for job in bulk_job.files],
+        summary=bulk_job.stats.summary(),
+        error=bulk_job.error,
+        created_at=bulk_job.created_at,
+        started_at=bulk_job.started_at,
+        finished_at=bulk_job.finished_at
+    )
+
+@router.get("/documents/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(
+    job_id: str,
+    ingestion_jobs: IngestionJobManager = Depends(get_ingestion_jobs)
+):
+    """Get the progress of a background ingestion job"""
+    job = ingestion_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return _job_response(job)
+
+def _job_response(job: IngestionJob) -> IngestionJobResponse:
+    return IngestionJobResponse(
+        job_id=job.id,
+        filename=job.filename,
+        status=job.status,
+        stage=job.stage,
+        total_pages=job.total_pages,
+        pages_processed=job.pages_processed,
+        total_chunks=job.total_chunks,
+        chunks_processed=job.chunks_processed,
+        message=job.message,
+        duplicate_of=job.duplicate_of,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
 
 @router.get("/documents", response_model=List[DocumentListResponse])
 async def list_documents(
-    doc_service: LangChainDocumentService = Depends(LangChainDocumentService)
+    response: Response,
+    cursor: Optional[str] = None,
+    page_size: int = Query(50, ge=1, le=200),
+    status: Optional[Literal["queued", "indexing", "indexed", "failed"]] = None,
+    q: Optional[str] = Query(None, description="Part of the filename, case-insensitive"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all uploaded documents"""
-    try:
-        return await doc_service.get_all_documents()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error listing documents: {str(e)}")
+    """List uploaded documents from the catalog, most recently uploaded first.
+    
+    Keyset-paginated like chat sessions: the `X-Next-Cursor` response header
+    is the `cursor` for the next page and is absent on the last one.
+    """
+    query = select(DocumentRecord).order_by(DocumentRecord.created_at.desc(), DocumentRecord.id.desc())
+    if status:
+        query = query.where(DocumentRecord.status == status)
+    if q:
+        query = query.where(DocumentRecord.filename.icontains(q, autoescape=True))
+    if cursor:
+        query = query.where(tuple_(DocumentRecord.created_at, DocumentRecord.id) < decode_cursor(cursor))
+    result = await db.execute(query.limit(page_size + 1))
+    
+    return [
+        DocumentListResponse(
+            filename=document.filename,
+            upload_date=document.created_at,
+            pages=document.pages,
+            size_mb=round((document.size_bytes or 0) / (1024 * 1024), 2),
+            chunks=document.chunks,
+            status=document.status,
+            error=document.error
+        )
+        for document in set_next_cursor(response, result.scalars().all(), page_size)
+    ]
 
 @router.delete("/documents/{filename}")
 async def delete_document(
     filename: str,
-    doc_service: LangChainDocumentService = Depends(LangChainDocumentService)
+    db: AsyncSession = Depends(get_async_db),
+    doc_service: LangChainDocumentService = Depends(get_document_service),
+    services: ServiceRegistry = Depends(get_services)
 ):
     """Delete a document and remove from vector database"""
-    file_path = os.path.join(settings.upload_dir, filename)
-    
-    if not os.path.exists(file_path):
+    found = await _find_documents([filename], db)
+    if not found:
         raise HTTPException(status_code=404, detail="Document not found")
     
     try:
-        # Remove from vector database
-        await doc_service.delete_document(filename)
-        
-        # Remove file
-        os.remove(file_path)
-        
-        return {"message": f"Document {filename} deleted successfully"}
-        
+        chunks = await _delete_documents(found, doc_service, services)
+        return {"message": f"Document {filename} deleted successfully. Removed {chunks} chunks."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting document: {str(e)}")
 
+@router.post("/documents/bulk-delete", response_model=DocumentBulkDeleteResponse)
+async def bulk_delete_documents(
+    request: DocumentBulkDeleteRequest,
+    db: AsyncSession = Depends(get_async_db),
+    doc_service: LangChainDocumentService = Depends(get_document_service),
+    services: ServiceRegistry = Depends(get_services)
+):
+    """Delete many documents at once: their chunks, upload files and catalog entries.
+    
+    Unknown filenames are reported in `not_found` rather than failing the request.
+    """
+    found = await _find_documents(request.filenames, db)
+    try:
+        chunks = await _delete_documents(found, doc_service, services) if found else 0
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting documents: {str(e)}")
+    
+    deleted = set(found)
+    return DocumentBulkDeleteResponse(
+        deleted=found,
+        not_found=[filename for filename in dict.fromkeys(request.filenames) if filename not in deleted],
+        chunks_removed=chunks
+    )
+
+async def _find_documents(filenames: List[str], db: AsyncSession) -> List[str]:
+    """The given filenames that are uploaded documents, without duplicates"""
+    # Plain names only, so nothing outside the upload directory is touched
+    filenames = [
+        filename for filename in dict.fromkeys(filenames)
+        if filename not in ("", ".", "..") and os.path.basename(filename) == filename
+    ]
+    if not filenames:
+        return []
+    result = await db.execute(select(DocumentRecord.filename).where(DocumentRecord.filename.in_(filenames)))
+    cataloged = set(result.scalars().all())
+    # A failed upload has a catalog entry but no file
+    return [
+        filename for filename in filenames
+        if filename in cataloged or os.path.exists(os.path.join(settings.upload_dir, filename))
+    ]
+
+async def _delete_documents(
+    filenames: List[str],
+    doc_service: LangChainDocumentService,
+    services: ServiceRegistry
+) -> int:
+    """Remove documents from the vector database, disk and catalog; returns the chunks removed"""
+    try:
+        chunks = await doc_service.delete_documents(filenames)
+    finally:
+        services.invalidate_answers()
+    
+    for filename in filenames:
+        file_path = os.path.join(settings.upload_dir, filename)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    await services.catalog.remove(filenames)
+    return chunks
+
 @router.get("/documents/view/{filename}")
 async def view_document(filename: str):
     """Serve a document file for viewing in browser"""
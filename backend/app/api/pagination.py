@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+import base64
+import json
+
+from fastapi import HTTPException, Response
+
+# Set when there are more items; pass its value back as `cursor` for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Opaque cursor pointing just past the row with this (created_at, id)"""
+    raw = json.dumps([created_at.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """The (created_at, id) in a cursor made by encode_cursor; 400 if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def split_page(rows: list, limit: int) -> Tuple[list, Dict[str, str]]:
+    """The page's rows and the headers advertising the next page.
+
+    Queries fetch `limit + 1` rows in page order; when the extra row is
+    there, it is dropped and the cursor points past the last row returned.
+    """
+    if len(rows) <= limit:
+        return rows, {}
+    rows = rows[:limit]
+    return rows, {NEXT_CURSOR_HEADER: encode_cursor(rows[-1].created_at, rows[-1].id)}
+
+
+def set_next_cursor(response: Response, rows: list, limit: int) -> List:
+    """split_page for endpoints returning models, setting the headers on `response`"""
+    rows, headers = split_page(rows, limit)
+    response.headers.update(headers)
+    return rows
@@ -0,0 +1,171 @@
+"""Bulk-ingest a directory or zip archive of PDF and TXT files.
+
+Sends the files to the running API's bulk upload endpoint, which indexes
+them in one pipeline, waits for it to finish and prints a throughput
+summary. Run from the backend directory:
+
+    python -m app.bulk_ingest .. --pattern "*.pdf"    # the client files in the repo root
+    python -m app.bulk_ingest matter.zip --url http://localhost:8001
+
+Subdirectories are searched with `--recursive`. Zip members are streamed
+straight from the archive, nothing is extracted to disk. The exit status
+is 1 if any file failed.
+"""
+import argparse
+import fnmatch
+import sys
+import time
+import zipfile
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Tuple
+
+import httpx
+
+EXTENSIONS = (".pdf", ".txt")
+MEDIA_TYPES = {".pdf": "application/pdf", ".txt": "text/plain"}
+
+# (filename, opener) for each file to upload
+Source = Tuple[str, Callable[[], BinaryIO]]
+
+
+def collect_sources(path: Path, pattern: str = "*", recursive: bool = False) -> List[Source]:
+    """PDF and TXT files matching `pattern` in a directory or a zip archive, by file name"""
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        members = [
+            member for member in archive.infolist()
+            if not member.is_dir()
+            and member.filename.lower().endswith(EXTENSIONS)
+            and fnmatch.fnmatch(Path(member.filename).name, pattern)
+        ]
+        found = [(Path(member.filename).name, lambda member=member: archive.open(member)) for member in members]
+    elif path.is_dir():
+        files = sorted(
+            file for file in (path.rglob(pattern) if recursive else path.glob(pattern))
+            if file.is_file() and file.suffix.lower() in EXTENSIONS
+        )
+        found = [(file.name, lambda file=file: open(file, "rb")) for file in files]
+    else:
+        raise SystemExit(f"{path} is neither a directory nor a zip archive")
+
+    # Uploads are stored by file name, so only the first of each name is sent
+    sources: Dict[str, Callable[[], BinaryIO]] = {}
+    for name, opener in found:
+        if name.startswith("."):
+            continue
+        if name in sources:
+            print(f"skipping {name}: another file has the same name", file=sys.stderr)
+            continue
+        sources[name] = opener
+    return list(sources.items())
+
+
+def upload(client: httpx.Client, sources: List[Source]) -> str:
+    """Send one bulk upload and return its job id"""
+    with ExitStack() as stack:
+        files = [
+            ("files", (name, stack.enter_context(opener()), MEDIA_TYPES[Path(name).suffix.lower()]))
+            for name, opener in sources
+        ]
+        response = client.post("/api/v1/documents/upload/bulk", files=files)
+    if response.status_code != 202:
+        raise SystemExit(f"Upload failed: {response.status_code} {response.text}")
+    return response.json()["job_id"]
+
+
+def wait(client: httpx.Client, job_ids: List[str], poll_seconds: float) -> List[dict]:
+    """Poll the bulk jobs until all of them have finished"""
+    while True:
+        jobs = []
+        for job_id in job_ids:
+            response = client.get(f"/api/v1/documents/bulk-jobs/{job_id}")
+            response.raise_for_status()
+            jobs.append(response.json())
+        files = [file for job in jobs for file in job["files"]]
+        done = sum(1 for file in files if file["status"] in ("completed", "failed"))
+        print(f"\r{done}/{len(files)} files", end="", file=sys.stderr, flush=True)
+        if all(job["status"] in ("completed", "failed") for job in jobs):
+            print(file=sys.stderr)
+            return jobs
+        time.sleep(poll_seconds)
+
+
+def print_summary(jobs: List[dict], upload_seconds: float, total_seconds: float):
+    totals: Dict[str, float] = {}
+    for job in jobs:
+        for key, value in job["summary"].items():
+            if not key.endswith("_per_second") and key != "elapsed_seconds":
+                totals[key] = totals.get(key, 0) + value
+    # Jobs of separate requests may overlap, so time the span they cover
+    index_seconds = (
+        max(datetime.fromisoformat(job["finished_at"]) for job in jobs)
+        - min(datetime.fromisoformat(job["started_at"] or job["finished_at"]) for job in jobs)
+    ).total_seconds()
+
+    rows = [
+        ("files", f"{totals['files']:.0f}"),
+        ("indexed", f"{totals['indexed']:.0f}"),
+        ("duplicates", f"{totals['duplicates']:.0f}"),
+        ("failed", f"{totals['failed']:.0f}"),
+        ("pages", f"{totals['pages']:.0f}"),
+        ("chunks written", f"{totals['chunks']:.0f}"),
+        ("chunks already indexed", f"{totals['already_indexed']:.0f}"),
+        ("chunks embedded", f"{totals['embedded']:.0f}"),
+        ("megabytes", f"{totals['megabytes']:.2f}"),
+        ("upload s", f"{upload_seconds:.2f}"),
+        ("indexing s", f"{index_seconds:.2f}"),
+        ("  parse s (all workers)", f"{totals['parse_seconds']:.2f}"),
+        ("  embed s", f"{totals['embed_seconds']:.2f}"),
+        ("  write s", f"{totals['write_seconds']:.2f}"),
+        ("total s", f"{total_seconds:.2f}"),
+    ]
+    if index_seconds:
+        rows += [
+            ("files/s", f"{totals['indexed'] / index_seconds:.2f}"),
+            ("pages/s", f"{totals['pages'] / index_seconds:.1f}"),
+            ("chunks/s", f"{totals['chunks'] / index_seconds:.1f}"),
+            ("MB/s", f"{totals['megabytes'] / index_seconds:.2f}"),
+        ]
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"{label:<{width}}  {value:>10}")
+
+    for job in jobs:
+        for file in job["files"]:
+            if file["status"] == "failed":
+                print(f"failed: {file['filename']}: {file['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", type=Path, help="directory or zip archive")
+    parser.add_argument("--pattern", default="*", help="file name pattern, e.g. '*.pdf'")
+    parser.add_argument("--recursive", action="store_true", help="include subdirectories")
+    parser.add_argument("--url", default="http://localhost:8001", help="API base URL")
+    parser.add_argument("--files-per-request", type=int, default=500,
+                        help="at most the API's BULK_UPLOAD_MAX_FILES")
+    parser.add_argument("--poll-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    sources = collect_sources(args.path, args.pattern, args.recursive)
+    if not sources:
+        raise SystemExit(f"No PDF or TXT files in {args.path}")
+
+    started = time.perf_counter()
+    with httpx.Client(base_url=args.url, timeout=httpx.Timeout(600.0, connect=10.0)) as client:
+        job_ids = [
+            upload(client, sources[start:start + args.files_per_request])
+            for start in range(0, len(sources), args.files_per_request)
+        ]
+        upload_seconds = time.perf_counter() - started
+        jobs = wait(client, job_ids, args.poll_seconds)
+
+    print_summary(jobs, upload_seconds, time.perf_counter() - started)
+    if any(file["status"] == "failed" for job in jobs for file in job["files"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
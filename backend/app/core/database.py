@@ -1,18 +1,64 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from sqlalchemy import JSON, BigInteger, Column, Index, Integer, String, Text, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from datetime import datetime
+import os
+
+import orjson
+
 from app.core.config import settings
 
+# Async drivers for the database URLs accepted in settings
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """`url` with its dialect switched to the matching async driver"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"Unsupported database: {backend}")
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def _json_serializer(value) -> str:
+    return orjson.dumps(value).decode()
+
+def _create_engine(url: str):
+    url = make_url(async_database_url(url))
+    # JSON columns go through orjson rather than the json module
+    json_options = {"json_serializer": _json_serializer, "json_deserializer": orjson.loads}
+    if url.get_backend_name() == "sqlite":
+        if url.database not in (None, "", ":memory:"):
+            return create_async_engine(url, echo=settings.database_echo, **json_options)
+        # One shared connection, so an in-memory database (sqlite:///:memory:)
+        # is the same database for every session, e.g. in tests
+        return create_async_engine(
+            url,
+            echo=settings.database_echo,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+            **json_options
+        )
+    return create_async_engine(
+        url,
+        echo=settings.database_echo,
+        **json_options,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        pool_recycle=settings.database_pool_recycle,
+        pool_pre_ping=True
+    )
+
 # SQLAlchemy setup
-# PostgreSQL configuration
-engine = create_engine(
-    settings.database_url,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async engine: PostgreSQL through asyncpg, or SQLite through aiosqlite
+engine = _create_engine(settings.database_url)
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 Base = declarative_base()
 
 class ChatSession(Base):
@@ -22,25 +68,72 @@ class ChatSession(Base):
     title = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Keyset pagination, newest first
+    __table_args__ = (Index("ix_chat_sessions_created_at_id", "created_at", "id"),)
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
     
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, nullable=False, index=True)
+    session_id = Column(Integer, nullable=False)
     role = Column(String(50), nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
-    sources = Column(Text)  # JSON string of source references
+    # None is stored as SQL NULL rather than a JSON null
+    sources = Column(JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"))  # List of source references
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Keyset pagination within a session; also serves lookups by session_id
+    __table_args__ = (Index("ix_chat_messages_session_id_created_at_id", "session_id", "created_at", "id"),)
+
+class ChatSessionSummary(Base):
+    __tablename__ = "chat_session_summaries"
+    
+    session_id = Column(Integer, primary_key=True)
+    summary = Column(Text, nullable=False)
+    summarized_through = Column(Integer, nullable=False)  # Last message id folded into the summary
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DocumentRecord(Base):
+    __tablename__ = "documents"
+    
+    id = Column(Integer, primary_key=True)
+    filename = Column(String(255), nullable=False, unique=True)
+    content_hash = Column(String(64), index=True)  # SHA-256 of the file, to recognize re-uploads
+    size_bytes = Column(BigInteger)
+    pages = Column(Integer)  # Known once the file has been parsed
+    chunks = Column(Integer, nullable=False, default=0)
+    status = Column(String(20), nullable=False, default="queued")  # queued, indexing, indexed, failed
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)  # Latest upload
+    indexed_at = Column(DateTime)
+    
+    # Keyset pagination, newest first
+    __table_args__ = (Index("ix_documents_created_at_id", "created_at", "id"),)
+
+# Alembic project: backend/alembic.ini and backend/migrations/
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _upgrade(connection):
+    # Imported here so alembic is only loaded when migrating
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(os.path.join(_BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(_BACKEND_DIR, "migrations"))
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
 
 async def init_db():
-    """Initialize the database and create tables"""
-    Base.metadata.create_all(bind=engine)
+    """Bring the database schema up to date by running the Alembic migrations"""
+    async with engine.begin() as conn:
+        await conn.run_sync(_upgrade)
+
+async def close_db():
+    """Close the connections in the pool"""
+    await engine.dispose()
 
-def get_db():
-    """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
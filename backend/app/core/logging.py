@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+import json
+import logging
+import sys
+
+from app.core.config import settings
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_STANDARD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = None, log_format: str = None):
+    """Send application logs to stdout, as JSON lines or plain text"""
+    handler = logging.StreamHandler(sys.stdout)
+    if (log_format or settings.log_format) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel((level or settings.log_level).upper())
+
+    # httpx logs every Ollama and ChromaDB round trip at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
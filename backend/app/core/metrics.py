@@ -0,0 +1,42 @@
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Seconds; the upper buckets are for LLM generations
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Fed by app.core.timing for every timed stage: embed, vector_query,
+# lexical_query, rerank, retrieve, llm_first_token, llm, db, ingest_embed,
+# ingest_write
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each pipeline stage",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS
+)
+
+PROMPT_EVAL_TOKENS = Histogram(
+    "rag_prompt_eval_tokens",
+    "Prompt tokens Ollama evaluated; a prefix reused from its cache is not counted",
+    buckets=(64, 128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)
+)
+
+LLM_IN_FLIGHT = Gauge("rag_llm_in_flight", "Generations currently running on Ollama")
+LLM_QUEUED = Gauge("rag_llm_queued", "Generations waiting for a free Ollama slot")
+
+COALESCED_REQUESTS = Counter(
+    "rag_coalesced_requests_total",
+    "Requests served by joining an identical computation already in flight",
+    ["flight"]
+)
+
+INGEST_QUEUE_DEPTH = Gauge("rag_ingest_queue_depth", "Ingestion jobs waiting for a worker")
+INGESTED_CHUNKS = Counter("rag_ingested_chunks_total", "Chunks embedded and written to the vector store")
+INGEST_CHUNKS_PER_SECOND = Histogram(
+    "rag_ingest_chunks_per_second",
+    "Indexing throughput per ingested document",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+)
+
+
+def render_metrics():
+    """Current metrics in the Prometheus text format, with its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
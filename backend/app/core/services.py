@@ -0,0 +1,140 @@
+from fastapi import Request
+from typing import Optional
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.document_catalog import DocumentCatalog
+from app.services.ingestion_jobs import IngestionJobManager
+from app.services.langchain_document_service import LangChainDocumentService
+from app.services.langchain_chat_service import LangChainChatService
+from app.services.pdf_extraction import shutdown_extraction_pool
+from app.services.ollama_client import OllamaClient, close_ollama_client, get_ollama_client
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Services created once at startup and shared by every request.
+
+    The embedding model, ChromaDB client, vector store and QA chain are all
+    safe to use from concurrent requests: they hold no per-request state, and
+    blocking calls into them are pushed to worker threads by the services.
+    """
+
+    def __init__(self):
+        self.document_service: Optional[LangChainDocumentService] = None
+        self.chat_service: Optional[LangChainChatService] = None
+        self.ollama_client: Optional[OllamaClient] = None
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        self.catalog = DocumentCatalog()
+        self.ingestion_jobs: Optional[IngestionJobManager] = None
+        self.startup_report: dict = {}
+        self._lock = asyncio.Lock()
+
+    async def startup(self) -> dict:
+        """Build and warm up all services, returning a report of what was loaded"""
+        try:
+            return await self.ensure_started()
+        except Exception as e:
+            # ChromaDB may not accept connections yet; the first request retries
+            logger.warning("Service startup deferred: %s", e)
+            self.startup_report = {"error": str(e)}
+            return self.startup_report
+
+    async def ensure_started(self) -> dict:
+        """Build the services if they are not running yet"""
+        if self.chat_service is None:
+            async with self._lock:
+                if self.chat_service is None:
+                    await self._build()
+        return self.startup_report
+
+    async def _build(self):
+        started = time.perf_counter()
+        report = {}
+
+        # Model loading and the first ChromaDB round trip are blocking
+        step = time.perf_counter()
+        self.document_service = await asyncio.to_thread(LangChainDocumentService)
+        report["document_service_ms"] = _elapsed_ms(step)
+
+        step = time.perf_counter()
+        self.ollama_client = get_ollama_client()
+        self.answer_cache = SemanticAnswerCache() if settings.answer_cache_enabled else None
+        self.chat_service = LangChainChatService(
+            document_service=self.document_service,
+            answer_cache=self.answer_cache
+        )
+        self.ingestion_jobs = IngestionJobManager(
+            self.document_service,
+            self.catalog,
+            on_corpus_change=self.invalidate_answers
+        )
+        report["chat_service_ms"] = _elapsed_ms(step)
+
+        step = time.perf_counter()
+        try:
+            report.update(await asyncio.to_thread(self.document_service.warm_up))
+        except Exception as e:
+            # ChromaDB may still be starting; requests will retry on their own
+            report["warm_up_error"] = str(e)
+        report["warm_up_ms"] = _elapsed_ms(step)
+
+        # Documents indexed before there was a catalog
+        try:
+            report["catalog_backfilled"] = await self.catalog.backfill(self.document_service.indexed_documents)
+        except Exception as e:
+            report["catalog_backfill_error"] = str(e)
+
+        report["total_ms"] = _elapsed_ms(started)
+        self.startup_report = report
+
+        logger.info("Services ready", extra=report)
+
+    def invalidate_answers(self):
+        """Forget cached answers after documents were added or removed"""
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate()
+
+    async def shutdown(self):
+        """Release connections held by the shared services"""
+        if self.ingestion_jobs is not None:
+            await self.ingestion_jobs.shutdown()
+        if self.document_service is not None:
+            self.document_service.close()
+        await close_ollama_client()
+        shutdown_extraction_pool()
+        self.ollama_client = None
+        self.answer_cache = None
+        self.ingestion_jobs = None
+        self.chat_service = None
+        self.document_service = None
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+async def get_services(request: Request) -> ServiceRegistry:
+    """Dependency to get the app-wide service registry"""
+    services = request.app.state.services
+    await services.ensure_started()
+    return services
+
+
+async def get_chat_service(request: Request) -> LangChainChatService:
+    """Dependency to get the shared chat service"""
+    return (await get_services(request)).chat_service
+
+
+async def get_document_service(request: Request) -> LangChainDocumentService:
+    """Dependency to get the shared document service"""
+    return (await get_services(request)).document_service
+
+
+async def get_ingestion_jobs(request: Request) -> IngestionJobManager:
+    """Dependency to get the background ingestion job manager"""
+    return (await get_services(request)).ingestion_jobs
@@ -5,8 +5,13 @@ import os
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import init_db
-from app.api.endpoints import chat, documents, health
+from app.core.database import close_db, init_db
+from app.core.logging import configure_logging
+from app.core.services import ServiceRegistry
+from app.core.timing import ServerTimingMiddleware
+from app.api.endpoints import chat, documents, health, metrics
+
+configure_logging()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -14,9 +19,12 @@ async def lifespan(app: FastAPI):
     await init_db()
     os.makedirs("uploads", exist_ok=True)
     os.makedirs("data", exist_ok=True)
+    app.state.services = ServiceRegistry()
+    await app.state.services.startup()
     yield
     # Shutdown
-    pass
+    await app.state.services.shutdown()
+    await close_db()
 
 app = FastAPI(
     title="RAG Chat API",
@@ -35,6 +43,9 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# Per-stage durations in a Server-Timing header
+app.add_middleware(ServerTimingMiddleware)
+
 # Mount static files for uploaded documents
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
@@ -43,6 +54,9 @@ app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(documents.router, prefix="/api/v1", tags=["documents"])
 app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
 
+# Prometheus scrapes /metrics at the root
+app.include_router(metrics.router, tags=["metrics"])
+
 @app.get("/")
 async def root():
     return {
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -37,14 +37,53 @@ class ChatMessageResponse(BaseModel):
 # Document Models
 class DocumentUploadResponse(BaseModel):
     filename: str
-    pages: int
+    pages: Optional[int] = None  # Known once ingestion has parsed the file
     message: str
+    job_id: Optional[str] = None
+    status: Optional[str] = None
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: str
+    stage: str
+    total_pages: Optional[int] = None
+    pages_processed: int
+    total_chunks: Optional[int] = None
+    chunks_processed: int
+    message: Optional[str] = None
+    duplicate_of: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class BulkIngestionJobResponse(BaseModel):
+    job_id: str
+    status: str
+    files: List[IngestionJobResponse]
+    summary: dict  # Counts and throughput so far
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 class DocumentListResponse(BaseModel):
     filename: str
     upload_date: Optional[datetime] = None
-    pages: int
+    pages: Optional[int] = None  # Known once the file has been parsed
     size_mb: float
+    chunks: int = 0
+    status: str = "indexed"  # queued, indexing, indexed, failed
+    error: Optional[str] = None
+
+class DocumentBulkDeleteRequest(BaseModel):
+    filenames: List[str] = Field(..., min_length=1, max_length=1000)
+
+class DocumentBulkDeleteResponse(BaseModel):
+    deleted: List[str]
+    not_found: List[str]
+    chunks_removed: int
 
 # Health Check
 class HealthResponse(BaseModel):
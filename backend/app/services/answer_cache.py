@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+import threading
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.schemas import SourceReference
+
+
+@dataclass
+class _CachedAnswer:
+    question: str
+    answer: str
+    sources: List[SourceReference]
+    corpus_version: int
+    created_at: float
+
+
+class SemanticAnswerCache:
+    """LRU/TTL cache of RAG answers keyed by question embedding.
+
+    A lookup returns the answer of the most similar cached question when its
+    cosine similarity reaches the threshold, so rephrasings of the same
+    question share one Ollama generation. Entries remember the corpus version
+    they were answered against and are never served for another one.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = None,
+        ttl_seconds: float = None,
+        similarity_threshold: float = None
+    ):
+        self.max_entries = max_entries or settings.answer_cache_max_entries
+        self.ttl_seconds = ttl_seconds or settings.answer_cache_ttl_seconds
+        self.similarity_threshold = similarity_threshold or settings.answer_cache_similarity_threshold
+
+        self._entries: "OrderedDict[int, _CachedAnswer]" = OrderedDict()
+        self._vectors: dict = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[int] = []
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, embedding: Sequence[float], corpus_version: int) -> Optional[Tuple[str, List[SourceReference]]]:
+        """Return (answer, sources) for the closest cached question, if close enough"""
+        query = _normalize(embedding)
+        with self._lock:
+            self._evict_expired()
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            matrix = self._get_matrix()
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            key = self._matrix_keys[best]
+            entry = self._entries[key]
+
+            if similarities[best] < self.similarity_threshold or entry.corpus_version != corpus_version:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.answer, list(entry.sources)
+
+    def store(
+        self,
+        embedding: Sequence[float],
+        question: str,
+        answer: str,
+        sources: List[SourceReference],
+        corpus_version: int
+    ):
+        """Cache an answer for a question"""
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = _CachedAnswer(
+                question=question,
+                answer=answer,
+                sources=list(sources),
+                corpus_version=corpus_version,
+                created_at=time.monotonic()
+            )
+            self._vectors[key] = _normalize(embedding)
+            self._matrix = None
+
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                del self._vectors[oldest]
+
+    def invalidate(self):
+        """Drop every cached answer, e.g. after the document set changed"""
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _evict_expired(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry.created_at < cutoff]
+        for key in expired:
+            del self._entries[key]
+            del self._vectors[key]
+        if expired:
+            self._matrix = None
+
+    def _get_matrix(self) -> np.ndarray:
+        # Rebuilt only after the entry set changed
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries.keys())
+            self._matrix = np.stack([self._vectors[key] for key in self._matrix_keys])
+        return self._matrix
+
+
+def _normalize(embedding: Sequence[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
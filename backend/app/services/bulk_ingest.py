@@ -0,0 +1,295 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+import asyncio
+import logging
+import os
+import time
+
+from langchain.schema import Document
+
+from app.core.config import settings
+from app.core.metrics import INGEST_CHUNKS_PER_SECOND, INGESTED_CHUNKS
+from app.core.timing import record_stage
+from app.services.chunking import ChunkedFile, chunk_file, chunk_id
+from app.services.document_catalog import DocumentCatalog
+from app.services.langchain_document_service import LangChainDocumentService
+from app.services.pdf_extraction import get_extraction_pool
+
+if TYPE_CHECKING:
+    from app.services.ingestion_jobs import IngestionJob
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BulkIngestStats:
+    files: int = 0
+    indexed: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    pages: int = 0
+    chunks: int = 0
+    already_indexed: int = 0  # Chunks found in the store and not written again
+    embedded: int = 0  # Chunks embedded by the model rather than read from the cache
+    bytes: int = 0
+    parse_seconds: float = 0.0  # Summed over the parse workers
+    embed_seconds: float = 0.0
+    write_seconds: float = 0.0
+    started: float = 0.0  # time.perf_counter() values
+    finished: float = 0.0
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if not self.started:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> dict:
+        elapsed = self.elapsed_seconds or 1e-9
+        return {
+            "files": self.files,
+            "indexed": self.indexed,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "already_indexed": self.already_indexed,
+            "embedded": self.embedded,
+            "megabytes": round(self.bytes / (1024 * 1024), 2),
+            "parse_seconds": round(self.parse_seconds, 3),
+            "embed_seconds": round(self.embed_seconds, 3),
+            "write_seconds": round(self.write_seconds, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "files_per_second": round(self.indexed / elapsed, 2),
+            "pages_per_second": round(self.pages / elapsed, 1),
+            "chunks_per_second": round(self.chunks / elapsed, 1),
+            "megabytes_per_second": round(self.bytes / (1024 * 1024) / elapsed, 2)
+        }
+
+
+@dataclass
+class _ParsedFile:
+    job: "IngestionJob"
+    chunked: ChunkedFile
+    ids: Set[str]
+    unwritten: int = 0  # Chunks still to be embedded and written
+
+
+@dataclass
+class _Batch:
+    chunks: List[Document] = field(default_factory=list)
+    owners: List[_ParsedFile] = field(default_factory=list)  # File of each chunk
+    vectors: List[List[float]] = field(default_factory=list)
+    completed: List[_ParsedFile] = field(default_factory=list)  # Files fully written once this batch is
+
+
+class BulkIngestPipeline:
+    """Indexes many stored files as parse → embed → write stages running concurrently.
+
+    Files are parsed and chunked in the extraction process pool, as many at
+    once as it has workers. A single embedding stage draws chunks from every
+    parsed file into full batches, so small files don't mean small batches,
+    and the model's own threads use the remaining cores. The writer upserts
+    each batch while the next one is embedded.
+
+    Stages are joined by bounded queues: at most `queue_size` parsed files
+    wait for embedding and two embedded batches wait for the writer, and a
+    parse worker holds on to its file until there is room. Memory stays
+    bounded by a few files and batches whatever the number of files.
+
+    Each file's job and catalog row follow its progress, like single
+    uploads. Content already in the catalog, or seen earlier in the same
+    run, is not indexed again.
+    """
+
+    def __init__(
+        self,
+        document_service: LangChainDocumentService,
+        catalog: DocumentCatalog,
+        parse_workers: int = None,
+        queue_size: int = None,
+        batch_size: int = None
+    ):
+        self.document_service = document_service
+        self.catalog = catalog
+        self.parse_workers = parse_workers or settings.pdf_extraction_workers or os.cpu_count()
+        self.queue_size = queue_size or settings.bulk_ingest_queue_size
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.stats = BulkIngestStats()
+
+    async def run(self, jobs: List["IngestionJob"]) -> BulkIngestStats:
+        """Index the jobs' files; a failed stage fails every file not indexed yet.
+
+        `stats` is updated as files go through, so it shows progress while
+        the run is going.
+        """
+        self.stats.files = len(jobs)
+        self.stats.started = time.perf_counter()
+        try:
+            to_parse = await self._check_duplicates(jobs)
+            parsed: asyncio.Queue = asyncio.Queue(self.queue_size)
+            batches: asyncio.Queue = asyncio.Queue(2)
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._parse_all(to_parse, parsed))
+                group.create_task(self._embed(parsed, batches))
+                group.create_task(self._write(batches))
+        except BaseException as e:
+            error = e.exceptions[0] if isinstance(e, BaseExceptionGroup) else e
+            await self._fail_unfinished(jobs, error)
+            raise error
+        finally:
+            self.stats.finished = time.perf_counter()
+            if self.stats.chunks:
+                self.document_service.bump_corpus_version()
+                INGESTED_CHUNKS.inc(self.stats.chunks)
+                INGEST_CHUNKS_PER_SECOND.observe(self.stats.chunks / self.stats.elapsed_seconds)
+            await asyncio.to_thread(self.document_service.save_indexes)
+            logger.info("Bulk ingestion finished", extra=self.stats.summary())
+        return self.stats
+
+    async def _check_duplicates(self, jobs: List["IngestionJob"]) -> List["IngestionJob"]:
+        """Settle the files whose content is already indexed; store and queue the others"""
+        seen: Dict[str, str] = {}
+        to_parse = []
+        for job in jobs:
+            existing = seen.get(job.content_hash) or await self.catalog.find_indexed(job.content_hash)
+            if existing is not None:
+                job.complete_as_duplicate(existing)
+                self.stats.duplicates += 1
+                continue
+            seen[job.content_hash] = job.filename
+            job.store_upload()
+            await self.catalog.queued(job.filename, job.content_hash, job.size_bytes)
+            to_parse.append(job)
+        return to_parse
+
+    async def _parse_all(self, jobs: List["IngestionJob"], parsed: asyncio.Queue):
+        workers = asyncio.Semaphore(self.parse_workers)
+        async with asyncio.TaskGroup() as group:
+            for job in jobs:
+                await workers.acquire()
+                group.create_task(self._parse(job, workers, parsed))
+        await parsed.put(None)
+
+    async def _parse(self, job: "IngestionJob", workers: asyncio.Semaphore, parsed: asyncio.Queue):
+        try:
+            job.update(status="running", stage="parsing", started_at=datetime.utcnow())
+            await self.catalog.update(job.filename, status="indexing")
+            step = time.perf_counter()
+            chunked = await asyncio.get_running_loop().run_in_executor(
+                get_extraction_pool(), chunk_file, job.file_path, job.filename, job.content_hash
+            )
+            elapsed = time.perf_counter() - step
+            self.stats.parse_seconds += elapsed
+            record_stage("ingest_parse", elapsed)
+            if not chunked.chunks:
+                raise ValueError(f"No content found in document: {job.filename}")
+        except Exception as e:
+            workers.release()
+            await self._fail(job, e)
+            return
+
+        job.update(
+            stage="embedding",
+            total_pages=chunked.pages,
+            pages_processed=chunked.pages,
+            total_chunks=len(chunked.chunks)
+        )
+        try:
+            # Keeps the worker slot until the embedder has room
+            await parsed.put(_ParsedFile(job, chunked, {chunk_id(chunk.metadata) for chunk in chunked.chunks}))
+        finally:
+            workers.release()
+
+    async def _embed(self, parsed: asyncio.Queue, batches: asyncio.Queue):
+        batch = _Batch()
+        while (file := await parsed.get()) is not None:
+            unwritten = await asyncio.to_thread(self.document_service.skip_indexed_chunks, file.chunked.chunks)
+            self.stats.already_indexed += len(file.chunked.chunks) - len(unwritten)
+            file.unwritten = len(unwritten)
+            if not unwritten:
+                batch.completed.append(file)
+            for position, chunk in enumerate(unwritten, 1):
+                batch.chunks.append(chunk)
+                batch.owners.append(file)
+                if position == len(unwritten):
+                    batch.completed.append(file)
+                if len(batch.chunks) >= self.batch_size:
+                    await batches.put(await self._embed_batch(batch))
+                    batch = _Batch()
+        if batch.chunks or batch.completed:
+            await batches.put(await self._embed_batch(batch))
+        await batches.put(None)
+
+    async def _embed_batch(self, batch: _Batch) -> _Batch:
+        if batch.chunks:
+            step = time.perf_counter()
+            batch.vectors, _, misses = await asyncio.to_thread(
+                self.document_service.embed_texts,
+                [chunk.page_content for chunk in batch.chunks]
+            )
+            elapsed = time.perf_counter() - step
+            self.stats.embed_seconds += elapsed
+            record_stage("ingest_embed", elapsed)
+            self.stats.embedded += misses
+        return batch
+
+    async def _write(self, batches: asyncio.Queue):
+        while (batch := await batches.get()) is not None:
+            if batch.chunks:
+                step = time.perf_counter()
+                await asyncio.to_thread(self.document_service.write_chunks, batch.chunks, batch.vectors)
+                elapsed = time.perf_counter() - step
+                self.stats.write_seconds += elapsed
+                record_stage("ingest_write", elapsed)
+                for file in batch.owners:
+                    file.job.chunks_processed += 1
+            for file in batch.completed:
+                await self._finish(file)
+
+    async def _finish(self, file: _ParsedFile):
+        """Record a file whose chunks are all in the store"""
+        job, chunked = file.job, file.chunked
+        # A replaced file leaves chunks of its previous version behind
+        await asyncio.to_thread(self.document_service.remove_stale_chunks, job.filename, file.ids)
+        self.document_service.entity_router.add(job.filename, chunked.entities)
+        await self.catalog.update(
+            job.filename,
+            content_hash=job.content_hash,
+            pages=chunked.pages,
+            chunks=len(chunked.chunks),
+            status="indexed",
+            indexed_at=datetime.utcnow()
+        )
+        job.update(
+            status="completed",
+            stage="done",
+            chunks_processed=len(chunked.chunks),
+            message=f"Document processed successfully. {len(chunked.chunks)} chunks indexed.",
+            finished_at=datetime.utcnow()
+        )
+        self.stats.indexed += 1
+        self.stats.pages += chunked.pages
+        self.stats.chunks += file.unwritten
+        self.stats.bytes += job.size_bytes or 0
+
+    async def _fail(self, job: "IngestionJob", error: BaseException):
+        detail = f"Error processing document {job.filename}: {error}"
+        job.fail(detail)
+        self.stats.failed += 1
+        try:
+            await self.catalog.update(job.filename, status="failed", error=detail)
+        except Exception:
+            pass
+
+    async def _fail_unfinished(self, jobs: List["IngestionJob"], error: BaseException):
+        for job in jobs:
+            if job.finished:
+                continue
+            # Don't leave a partial copy that would later pass as already indexed
+            try:
+                await asyncio.to_thread(self.document_service.discard_chunks, job.filename, job.content_hash)
+            except Exception:
+                pass
+            await self._fail(job, error)
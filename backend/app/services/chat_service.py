@@ -1,11 +1,12 @@
-import httpx
 from typing import List, Tuple
-import json
+import logging
 
-from app.core.config import settings
 from app.models.schemas import SourceReference
+from app.services.ollama_client import OllamaError, get_ollama_client
 from app.services.simple_chromadb import SimpleChromaDB
 
+logger = logging.getLogger(__name__)
+
 class ChatService:
     def __init__(self):
         # Initialize simple ChromaDB client
@@ -63,39 +64,20 @@ Provide a clear, direct answer based on the relevant information."""
         
         # Step 4: Get response from Ollama
         try:
-            async with httpx.AsyncClient() as client:
-                payload = {
-                    "model": settings.ollama_model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "top_p": 0.9,
-                        "num_predict": 500,  # Reduce token limit for faster responses
-                        "num_ctx": 2048     # Limit context window
-                    }
+            result = await get_ollama_client().generate(
+                prompt,
+                options={
+                    "temperature": 0.7,
+                    "top_p": 0.9,
+                    "num_predict": 500,  # Reduce token limit for faster responses
+                    "num_ctx": 2048     # Limit context window
                 }
-                
-                print(f"Sending request to Ollama: {settings.ollama_url}/api/generate")
-                print(f"Payload: {payload}")
-                
-                response = await client.post(
-                    f"{settings.ollama_url}/api/generate",
-                    json=payload,
-                    timeout=60.0  # Reasonable 1-minute timeout
-                )
-                
-                print(f"Ollama response status: {response.status_code}")
-                print(f"Ollama response text: {response.text}")
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    ai_response = result.get('response', 'Sorry, I could not generate a response.')
-                else:
-                    ai_response = f"AI service error: HTTP {response.status_code} - {response.text}"
-                    
+            )
+            ai_response = result.get('response', 'Sorry, I could not generate a response.')
+        except OllamaError as e:
+            ai_response = f"AI service error: HTTP {e.status_code} - {e.detail}"
         except Exception as e:
-            print(f"Exception in AI service: {e}")
+            logger.exception("AI service call failed")
             ai_response = f"Error communicating with AI service: {str(e)}"
         
         # Step 5: Let AI handle source relevance - return all sources if AI used context
@@ -1,6 +1,10 @@
+import logging
+
 import chromadb
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 def get_chroma_client():
     """Get ChromaDB client with minimal configuration to avoid v1 API issues"""
     try:
@@ -11,6 +15,6 @@ def get_chroma_client():
         )
         return client
     except Exception as e:
-        print(f"ChromaDB connection error: {e}")
+        logger.warning("ChromaDB connection error: %s", e)
         # If even minimal config fails, we need to handle this gracefully
         raise Exception(f"Failed to connect to ChromaDB: {e}")
\ No newline at end of file
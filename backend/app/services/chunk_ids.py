@@ -0,0 +1,22 @@
+import hashlib
+
+
+def make_chunk_id(content_hash: str, filename: str, page: int, offset: int) -> str:
+    """Deterministic chunk id from (document hash, filename, page, chunk offset).
+    
+    Re-indexing the same file yields the same ids, so writes can be upserts
+    and chunks that are already stored can be skipped. The filename keeps
+    identical content uploaded under two names from sharing chunks, so each
+    copy's chunks are its own to skip, replace or delete.
+    """
+    key = f"{content_hash}:{filename}:{page}:{offset}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def file_sha256(file_path: str) -> str:
+    """SHA-256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.services.chunk_ids import make_chunk_id
+from app.services.entities import extract_entities
+from app.services.pdf_extraction import ExtractedDocument, open_document
+
+
+def make_text_splitter() -> RecursiveCharacterTextSplitter:
+    """The splitter every document is chunked with; chunk ids depend on its output"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len,
+        add_start_index=True,  # Offset within the page, part of the chunk id
+        separators=[
+            "\n\n",  # Double newlines (paragraphs)
+            "\nCASE DETAILS:",
+            "\nLEGAL ISSUES:",
+            "\nDAMAGES:",
+            "\nEMPLOYMENT DETAILS:",
+            "\nPERSONAL INFORMATION:",
+            "\nCLIENT ID:",
+            "\n",  # Single newlines
+            ". ",  # Sentences
+            " ",   # Words
+            ""     # Characters
+        ]
+    )
+
+
+def chunk_id(metadata: dict) -> str:
+    """Deterministic id of a chunk produced by the LangChain splitter"""
+    return make_chunk_id(metadata["content_hash"], metadata["filename"], metadata["page"], metadata["start_index"])
+
+
+def split_document(
+    document: ExtractedDocument,
+    file_path: str,
+    filename: str,
+    content_hash: str,
+    text_splitter: RecursiveCharacterTextSplitter,
+    entities: Dict[str, str],
+    on_page: Optional[Callable[[int, int], None]] = None
+) -> Iterator[Document]:
+    """Split each page of `document` as it is extracted.
+
+    Client fields (id, name, case type, defendant) are read from the first
+    page into `entities` and copied into the metadata of every chunk.
+    `on_page` is called with (pages processed, chunks so far) after each page.
+    """
+    total_chunks = 0
+    for page in document:
+        if page.number == 0:
+            entities.update(extract_entities(page.text))
+        page_document = Document(
+            page_content=page.text,
+            metadata={
+                "source": file_path,
+                "filename": filename,
+                "content_hash": content_hash,
+                # 0-based for PDFs as PyPDFLoader did; text files are page 1
+                "page": page.number if document.is_pdf else 1,
+                **entities
+            }
+        )
+        chunks = text_splitter.split_documents([page_document])
+        total_chunks += len(chunks)
+        if on_page is not None:
+            on_page(page.number + 1, total_chunks)
+        yield from chunks
+
+
+@dataclass
+class ChunkedFile:
+    pages: int
+    chunks: List[Document]
+    entities: Dict[str, str]
+
+
+_text_splitter: Optional[RecursiveCharacterTextSplitter] = None
+
+
+def chunk_file(file_path: str, filename: str, content_hash: str) -> ChunkedFile:
+    """Process pool worker: extract and split a whole file.
+
+    Pages are read one after the other: bulk ingestion runs one file per
+    worker, so the parallelism is across files rather than within one.
+    """
+    global _text_splitter
+    if _text_splitter is None:
+        _text_splitter = make_text_splitter()
+    entities = {}
+    with open_document(file_path, filename, parallel=False) as document:
+        chunks = list(split_document(document, file_path, filename, content_hash, _text_splitter, entities))
+        return ChunkedFile(pages=document.page_count, chunks=chunks, entities=entities)
@@ -0,0 +1,280 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+import logging
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, ChatMessage, ChatSessionSummary
+from app.core.timing import stage
+from app.services.ollama_client import get_ollama_client
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a token in characters for English text; close enough to
+# budget prompts without loading the model's tokenizer
+_CHARS_PER_TOKEN = 4
+
+_ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+_SUMMARY_PROMPT = """Update the summary of a conversation between a user and a legal case assistant. Keep client names, client IDs, case details and the facts already established. Use at most {words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+_REWRITE_REQUEST = """Rewrite this follow-up question so it can be understood without the conversation. Keep names, client IDs and other specifics. Reply with the question only.
+
+Follow-up question: {question}"""
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def truncate_tokens(text: str, tokens: int) -> str:
+    """`text` cut to roughly `tokens` tokens"""
+    limit = tokens * _CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
+
+
+@dataclass
+class ConversationContext:
+    """What the model sees of a session: a rolling summary plus the latest messages"""
+    summary: str = ""
+    messages: List[Tuple[str, str]] = field(default_factory=list)  # (role, content), oldest first
+
+    @property
+    def empty(self) -> bool:
+        return not self.summary and not self.messages
+
+    def as_messages(self) -> List[dict]:
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+        messages.extend({"role": role, "content": content} for role, content in self.messages)
+        return messages
+
+
+def chat_messages(instructions: str, conversation: Optional[ConversationContext], request: str) -> List[dict]:
+    """Messages for Ollama's chat API, laid out so consecutive calls share a prefix.
+
+    Static instructions come first, then the session's summary and turns,
+    which only grow between summary updates, then the new request with its
+    retrieved context. Ollama reuses the KV cache of the longest shared
+    prefix, so a follow-up turn is only charged for the tokens after it.
+    """
+    messages = [{"role": "system", "content": instructions}]
+    if conversation is not None:
+        messages.extend(conversation.as_messages())
+    messages.append({"role": "user", "content": request})
+    return messages
+
+
+@dataclass
+class _SessionState:
+    summary: str
+    summarized_through: int
+    messages: List[Tuple[int, str, str]]  # (id, role, content) after summarized_through
+    last_seen: int  # Highest message id read so far
+    touched: float
+
+
+class ConversationMemory:
+    """Per-session conversation state for answering follow-up questions.
+
+    Messages since the last summary are kept verbatim and only ever appended
+    to, so the prompt prefix stays stable from one turn to the next. Once
+    there are `2 * recent_messages` of them, or they no longer fit
+    `history_tokens`, all but the newest `recent_messages` are folded into a
+    summary stored in `chat_session_summaries`.
+
+    Sessions are also kept in process between turns, so a follow-up only
+    reads the messages added since; state idle for longer than Ollama keeps
+    the model loaded is dropped.
+    """
+
+    def __init__(
+        self,
+        instructions: str,
+        recent_messages: int = None,
+        history_tokens: int = None,
+        summary_tokens: int = None,
+        rewrite: bool = None,
+        idle_seconds: float = None,
+        max_sessions: int = None
+    ):
+        self.instructions = instructions
+        self.recent_messages = recent_messages or settings.conversation_recent_messages
+        self.history_tokens = history_tokens or settings.conversation_history_tokens
+        self.summary_tokens = summary_tokens or settings.conversation_summary_tokens
+        self.rewrite_enabled = settings.conversation_rewrite_enabled if rewrite is None else rewrite
+        self.idle_seconds = idle_seconds or settings.conversation_session_idle_seconds
+        self.max_sessions = max_sessions or settings.conversation_max_sessions
+        # Each verbatim message gets an equal share of what the summary leaves
+        self.message_tokens = max(1, (self.history_tokens - self.summary_tokens) // self.recent_messages)
+
+        self._sessions: "OrderedDict[int, _SessionState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self._sessions)
+
+    async def load(self, db: AsyncSession, session_id: int, before_message_id: int) -> ConversationContext:
+        """The conversation preceding message `before_message_id`, within the token budget"""
+        state = self._get(session_id)
+        with stage("db"):
+            if state is None:
+                summary_row = await db.get(ChatSessionSummary, session_id)
+                summarized_through = summary_row.summarized_through if summary_row else 0
+                state = _SessionState(
+                    summary=summary_row.summary if summary_row else "",
+                    summarized_through=summarized_through,
+                    messages=[],
+                    last_seen=summarized_through,
+                    touched=0.0
+                )
+            result = await db.execute(
+                select(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+                .where(
+                    ChatMessage.session_id == session_id,
+                    ChatMessage.id > state.last_seen,
+                    ChatMessage.id < before_message_id
+                )
+                .order_by(ChatMessage.id.desc())
+                .limit(self.recent_messages * 4)
+            )
+            rows = list(reversed(result.all()))
+
+        # A new state object rather than mutating the cached one, which a
+        # concurrent request of the same session may be reading
+        messages = state.messages + [
+            (message_id, role, truncate_tokens(content, self.message_tokens))
+            for message_id, role, content in rows
+        ]
+        state = _SessionState(
+            summary=state.summary,
+            summarized_through=state.summarized_through,
+            messages=messages[-self.recent_messages * 4:],
+            last_seen=rows[-1][0] if rows else state.last_seen,
+            touched=time.monotonic()
+        )
+
+        recent = state.messages
+        if len(recent) >= self.recent_messages * 2 or self._tokens(state.summary, recent) > self.history_tokens:
+            folded, recent = recent[:-self.recent_messages], recent[-self.recent_messages:]
+            summary = await self._fold(session_id, state.summary, folded)
+            if summary:
+                state.summary = summary
+                state.summarized_through = folded[-1][0]
+                state.messages = recent
+            # Otherwise keep everything for the next attempt and send only
+            # the newest messages this turn
+
+        self._put(session_id, state)
+        return ConversationContext(
+            summary=state.summary,
+            messages=[(role, content) for _, role, content in recent]
+        )
+
+    def forget(self, session_id: int):
+        """Drop the in-process state of a deleted session"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _tokens(self, summary: str, messages: List[Tuple[int, str, str]]) -> int:
+        return estimate_tokens(summary) + sum(estimate_tokens(content) for _, _, content in messages)
+
+    def _get(self, session_id: int) -> Optional[_SessionState]:
+        with self._lock:
+            self._evict_idle()
+            state = self._sessions.get(session_id)
+            if state is not None:
+                self._sessions.move_to_end(session_id)
+            return state
+
+    def _put(self, session_id: int, state: _SessionState):
+        with self._lock:
+            self._sessions[session_id] = state
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _evict_idle(self):
+        # Least recently used first, so stop at the first live session
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._sessions:
+            session_id, state = next(iter(self._sessions.items()))
+            if state.touched > cutoff:
+                break
+            del self._sessions[session_id]
+
+    async def standalone_question(self, question: str, context: ConversationContext) -> str:
+        """`question` rewritten to stand on its own, for retrieval"""
+        if not self.rewrite_enabled or context.empty:
+            return question
+        # Same prefix as the answer that follows, so both share Ollama's cache
+        messages = chat_messages(self.instructions, context, _REWRITE_REQUEST.format(question=question))
+        try:
+            with stage("query_rewrite"):
+                result = await get_ollama_client().chat(messages, {"temperature": 0.0, "num_predict": 64})
+        except Exception as e:
+            logger.warning("Query rewrite failed: %s", e)
+            return question
+
+        rewritten = result.get("message", {}).get("content", "").strip().splitlines()
+        rewritten = rewritten[0].strip().strip('"') if rewritten else ""
+        # A rambling reply is worse for retrieval than the original question
+        if not rewritten or len(rewritten) > len(question) * 4 + 200:
+            return question
+        return rewritten
+
+    async def _fold(self, session_id: int, summary: str, folded: List[Tuple[int, str, str]]) -> Optional[str]:
+        """Merge `folded` messages into the session summary and store it"""
+        messages = "\n".join(
+            f"{_ROLE_LABELS.get(role, role)}: {content}"
+            for _, role, content in folded
+        )
+        prompt = _SUMMARY_PROMPT.format(
+            words=self.summary_tokens * 3 // 4,
+            summary=summary or "(none)",
+            messages=messages
+        )
+        try:
+            with stage("summarize"):
+                result = await get_ollama_client().generate(
+                    prompt,
+                    {"temperature": 0.0, "num_predict": self.summary_tokens}
+                )
+        except Exception as e:
+            # Keep the old summary; the same messages are folded next turn
+            logger.warning("Conversation summary failed: %s", e)
+            return None
+
+        summary = truncate_tokens(result.get("response", "").strip(), self.summary_tokens)
+        if not summary:
+            return None
+        # Own session, so a failed write can't roll back the caller's
+        async with AsyncSessionLocal() as summary_db:
+            try:
+                await summary_db.merge(ChatSessionSummary(
+                    session_id=session_id,
+                    summary=summary,
+                    summarized_through=folded[-1][0]
+                ))
+                with stage("db"):
+                    await summary_db.commit()
+            except Exception as e:
+                # Another request of the same session stored its summary first
+                await summary_db.rollback()
+                logger.warning("Storing conversation summary failed: %s", e)
+        return summary
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+import asyncio
+import logging
+import os
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, DocumentRecord
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentCatalog:
+    """The `documents` table: one row per uploaded file and its indexing status.
+
+    Kept up to date by ingestion, so listing documents and recognizing a
+    re-upload are indexed queries rather than reads of the vector store.
+    Each call uses its own database session.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal):
+        self._sessions = session_factory
+
+    async def find_indexed(self, content_hash: str) -> Optional[str]:
+        """The filename already indexed with this content, if any"""
+        async with self._sessions() as db:
+            return await db.scalar(
+                select(DocumentRecord.filename)
+                .where(DocumentRecord.content_hash == content_hash, DocumentRecord.status == "indexed")
+                .limit(1)
+            )
+
+    async def queued(self, filename: str, content_hash: Optional[str], size_bytes: Optional[int]):
+        """Record an upload waiting to be indexed, replacing any earlier upload of the same name"""
+        values = dict(
+            content_hash=content_hash,
+            size_bytes=size_bytes,
+            pages=None,
+            chunks=0,
+            status="queued",
+            error=None,
+            created_at=datetime.utcnow(),
+            indexed_at=None
+        )
+        async with self._sessions() as db:
+            result = await db.execute(
+                update(DocumentRecord).where(DocumentRecord.filename == filename).values(**values)
+            )
+            if not result.rowcount:
+                db.add(DocumentRecord(filename=filename, **values))
+            await db.commit()
+
+    async def update(self, filename: str, **values):
+        """Set columns of the document's row"""
+        async with self._sessions() as db:
+            await db.execute(update(DocumentRecord).where(DocumentRecord.filename == filename).values(**values))
+            await db.commit()
+
+    async def remove(self, filenames: Iterable[str]):
+        async with self._sessions() as db:
+            await db.execute(delete(DocumentRecord).where(DocumentRecord.filename.in_(list(filenames))))
+            await db.commit()
+
+    async def backfill(self, indexed_documents: Callable[[], list]) -> int:
+        """Fill an empty catalog with the documents already in the vector store.
+
+        `indexed_documents` is the document service's scan of chunk metadata;
+        it blocks, so it runs in a worker thread. Returns the rows added.
+        """
+        async with self._sessions() as db:
+            if await db.scalar(select(DocumentRecord.id).limit(1)) is not None:
+                return 0
+
+        documents = await asyncio.to_thread(indexed_documents)
+        if not documents:
+            return 0
+        now = datetime.utcnow()
+        async with self._sessions() as db:
+            for document in documents:
+                # Size and upload time of the stored file, when it is still there
+                path = os.path.join(settings.upload_dir, document["filename"])
+                stat = os.stat(path) if os.path.exists(path) else None
+                db.add(DocumentRecord(
+                    filename=document["filename"],
+                    content_hash=document["content_hash"],
+                    size_bytes=stat.st_size if stat else None,
+                    pages=document["pages"],
+                    chunks=document["chunks"],
+                    status="indexed",
+                    created_at=datetime.utcfromtimestamp(stat.st_mtime) if stat else now,
+                    indexed_at=now
+                ))
+            await db.commit()
+        logger.info("Filled document catalog from the vector store", extra={"documents": len(documents)})
+        return len(documents)
@@ -1,8 +1,7 @@
-import fitz  # PyMuPDF
 from typing import List
-import uuid
 
-from app.core.config import settings
+from app.services.chunk_ids import file_sha256, make_chunk_id
+from app.services.pdf_extraction import open_document
 from app.services.simple_chromadb import SimpleChromaDB
 
 class DocumentService:
@@ -16,51 +15,26 @@ class DocumentService:
         documents = []
         metadatas = []
         ids = []
+        content_hash = file_sha256(file_path)
         
-        # Determine file type and extract text
-        if filename.lower().endswith('.pdf'):
-            # Extract text from PDF
-            doc = fitz.open(file_path)
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                
+        # Extract text page by page
+        with open_document(file_path, filename) as document:
+            for page in document:
                 # Skip empty pages
-                if not text.strip():
+                if not page.text.strip():
                     continue
                 
                 # Split into chunks (simple sentence-based chunking)
-                chunks = self._chunk_text(text, max_length=500)
-                
-                for i, chunk in enumerate(chunks):
-                    documents.append(chunk)
-                    metadatas.append({
-                        "filename": filename,
-                        "page": page_num + 1,
-                        "chunk": i + 1
-                    })
-                    ids.append(str(uuid.uuid4()))
-            
-            doc.close()
-            
-        elif filename.lower().endswith('.txt'):
-            # Extract text from TXT file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-            
-            if text.strip():
-                # Split into chunks (simple sentence-based chunking)
-                chunks = self._chunk_text(text, max_length=500)
+                chunks = self._chunk_text(page.text, max_length=500)
                 
                 for i, chunk in enumerate(chunks):
                     documents.append(chunk)
                     metadatas.append({
                         "filename": filename,
-                        "page": 1,  # Text files have only one "page"
+                        "page": page.number + 1,  # Text files have only one "page"
                         "chunk": i + 1
                     })
-                    ids.append(str(uuid.uuid4()))
+                    ids.append(make_chunk_id(content_hash, filename, page.number + 1, i))
         
         # Add to ChromaDB
         if documents:
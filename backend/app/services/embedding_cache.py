@@ -0,0 +1,175 @@
+from typing import Dict, List, Sequence, Tuple
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+from app.core.config import settings
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk store of chunk embeddings.
+
+    Each embedding model gets its own directory holding `vectors.f32`, a
+    memory-mapped float32 matrix with one row per distinct chunk text, and
+    `index.tsv`, an append-only map from the text's SHA-256 to its row.
+    Vectors are written before their index line, so a crash can at worst
+    leave unreferenced rows behind; a partial row or index line at the end
+    is cut off on load. Meant for a single writer process.
+    """
+
+    def __init__(self, directory: str = None, model_name: str = None):
+        self.model_name = model_name or settings.embedding_model_name
+        self.directory = os.path.join(
+            directory or settings.embedding_cache_dir,
+            re.sub(r'[^a-zA-Z0-9._-]', '_', self.model_name)
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._index_path = os.path.join(self.directory, "index.tsv")
+        self._meta_path = os.path.join(self.directory, "meta.json")
+
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._dim = None
+        self._stored_rows = 0
+        self._matrix = None
+        self._load()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self._dim = json.load(f)["dim"]
+
+        # A crash mid-append leaves a partial row at the end. Cut it off so
+        # the next append starts on a row boundary; rows written after it
+        # would otherwise be read shifted.
+        if os.path.exists(self._vectors_path):
+            row_bytes = 4 * self._dim if self._dim else 0
+            size = os.path.getsize(self._vectors_path)
+            self._stored_rows = size // row_bytes if row_bytes else 0
+            if self._stored_rows * row_bytes != size:
+                os.truncate(self._vectors_path, self._stored_rows * row_bytes)
+        if self._dim is None or not os.path.exists(self._index_path):
+            return
+
+        # Likewise a partial last index line, which the next line would be appended to
+        complete = 0
+        with open(self._index_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                complete += len(line)
+                parts = line.decode("utf-8").rstrip("\n").split("\t")
+                if len(parts) == 2 and int(parts[1]) < self._stored_rows:
+                    self._rows[parts[0]] = int(parts[1])
+        if complete != os.path.getsize(self._index_path):
+            os.truncate(self._index_path, complete)
+
+    def _get_matrix(self) -> np.ndarray:
+        # Remap once the file has grown past the mapped rows
+        if self._matrix is None or self._matrix.shape[0] < self._stored_rows:
+            self._matrix = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(self._stored_rows, self._dim)
+            )
+        return self._matrix
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for the keys that are present"""
+        with self._lock:
+            present = [key for key in keys if key in self._rows]
+            if not present:
+                return {}
+            matrix = self._get_matrix()
+            return {key: matrix[self._rows[key]].tolist() for key in present}
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Store vectors for keys that are not cached yet"""
+        with self._lock:
+            new = [(key, vector) for key, vector in zip(keys, vectors) if key not in self._rows]
+            if not new:
+                return
+
+            if self._dim is None:
+                self._dim = len(new[0][1])
+                with open(self._meta_path, "w") as f:
+                    json.dump({"model": self.model_name, "dim": self._dim}, f)
+
+            # Rows are appended after everything already in the file
+            next_row = self._stored_rows
+            block = np.asarray([vector for _, vector in new], dtype=np.float32)
+            with open(self._vectors_path, "ab") as f:
+                f.write(block.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._stored_rows += len(new)
+
+            with open(self._index_path, "a") as f:
+                for offset, (key, _) in enumerate(new):
+                    f.write(f"{key}\t{next_row + offset}\n")
+                    self._rows[key] = next_row + offset
+
+    def record(self, hits: int, misses: int):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "entries": len(self._rows),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the underlying model"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents_with_stats(self, texts: List[str]) -> Tuple[List[List[float]], int, int]:
+        """Embed texts and return (vectors, cache hits, cache misses)"""
+        keys = [text_hash(text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            self.cache.put_many(list(missing.keys()), vectors)
+            found.update(zip(missing.keys(), vectors))
+
+        hits = len(texts) - len(missing)
+        self.cache.record(hits, len(missing))
+        return [list(found[key]) for key in keys], hits, len(missing)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents_with_stats(texts)[0]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Questions are rarely repeated verbatim; see the answer cache instead
+        return self.embeddings.embed_query(text)
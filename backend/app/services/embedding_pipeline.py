@@ -0,0 +1,120 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+import time
+
+from langchain.schema import Document
+
+from app.core.config import settings
+from app.core.timing import record_stage
+
+# (texts) -> (vectors, cache hits, cache misses)
+EmbedFunction = Callable[[List[str]], Tuple[List[List[float]], int, int]]
+# (chunks, vectors) -> None
+WriteFunction = Callable[[List[Document], List[List[float]]], None]
+# (chunks) -> chunks that still need embedding and writing
+FilterFunction = Callable[[List[Document]], List[Document]]
+
+
+@dataclass
+class IndexingStats:
+    chunks: int = 0
+    skipped: int = 0
+    batches: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    embed_seconds: float = 0.0
+    write_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+class BatchedIndexer:
+    """Embeds chunks in fixed-size batches and pipelines the vector store writes.
+
+    While batch N is written by a dedicated writer thread, batch N+1 is
+    embedded on the calling thread, so the store round trip overlaps with
+    model inference. At most one write is in flight, which bounds memory to
+    two batches whatever the document size. `chunks` may be a lazy iterable.
+    When `skip` is given it runs before embedding and returns the chunks of
+    a batch that are not indexed yet; the others count as `skipped`.
+    """
+
+    def __init__(
+        self,
+        embed: EmbedFunction,
+        write: WriteFunction,
+        skip: Optional[FilterFunction] = None,
+        batch_size: int = None
+    ):
+        self.embed = embed
+        self.write = write
+        self.skip = skip
+        self.batch_size = batch_size or settings.embedding_batch_size
+
+    def run(
+        self,
+        chunks: Iterable[Document],
+        on_batch_written: Optional[Callable[[IndexingStats], None]] = None
+    ) -> IndexingStats:
+        stats = IndexingStats()
+        started = time.perf_counter()
+        pending: Optional[Future] = None
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-writer") as writer:
+            for batch in _batches(chunks, self.batch_size):
+                if self.skip is not None:
+                    remaining = self.skip(batch)
+                    stats.skipped += len(batch) - len(remaining)
+                    batch = remaining
+                    if not batch:
+                        continue
+
+                step = time.perf_counter()
+                vectors, hits, misses = self.embed([chunk.page_content for chunk in batch])
+                elapsed = time.perf_counter() - step
+                stats.embed_seconds += elapsed
+                record_stage("ingest_embed", elapsed)
+                stats.cache_hits += hits
+                stats.cache_misses += misses
+
+                # Wait for the previous batch before queueing this one
+                if pending is not None:
+                    pending.result()
+                    _report(on_batch_written, stats)
+                pending = writer.submit(self._write_batch, batch, vectors, stats)
+
+            if pending is not None:
+                pending.result()
+                _report(on_batch_written, stats)
+
+        stats.elapsed_seconds = time.perf_counter() - started
+        return stats
+
+    def _write_batch(self, batch: List[Document], vectors: List[List[float]], stats: IndexingStats):
+        step = time.perf_counter()
+        self.write(batch, vectors)
+        elapsed = time.perf_counter() - step
+        stats.write_seconds += elapsed
+        record_stage("ingest_write", elapsed)
+        stats.chunks += len(batch)
+        stats.batches += 1
+
+
+def _batches(chunks: Iterable[Document], size: int) -> Iterable[List[Document]]:
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _report(callback: Optional[Callable[[IndexingStats], None]], stats: IndexingStats):
+    if callback:
+        callback(stats)
@@ -0,0 +1,142 @@
+from typing import Dict, List, Optional
+import json
+import os
+import re
+import threading
+
+from app.core.config import settings
+
+# Metadata key -> field label in the client files from generate_client_files.py.
+# The PDF table puts each value on the line after its label.
+ENTITY_FIELDS = {
+    "client_id": "Client ID",
+    "client_name": "Full Name",
+    "case_type": "Case Type",
+    "defendant": "Employer/Defendant",
+}
+
+_FIELD_PATTERNS = {
+    key: re.compile(rf"^\s*{re.escape(label)}:[ \t]*\n?[ \t]*(\S[^\n]*)", re.MULTILINE | re.IGNORECASE)
+    for key, label in ENTITY_FIELDS.items()
+}
+_CLIENT_ID = re.compile(r"\b[A-Z]+-\d+\b", re.IGNORECASE)
+
+
+def extract_entities(text: str) -> Dict[str, str]:
+    """Structured client fields found in a page of text; missing fields are left out"""
+    entities = {}
+    for key, pattern in _FIELD_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            value = match.group(1).strip()
+            if value and not value.endswith(":"):
+                entities[key] = value
+    return entities
+
+
+def _mentions(question: str, phrase: str) -> bool:
+    return re.search(rf"\b{re.escape(phrase.lower())}\b", question) is not None
+
+
+class EntityRouter:
+    """Maps entity mentions in a question to metadata filters.
+
+    Keeps the entities of every indexed document (client id, name, case
+    type, defendant), persisted as JSON under `data/`. A question naming a
+    known client, by id, full name or a surname only one client has, is
+    routed to that client's chunks. A defendant or case type doesn't pin
+    the question to those clients ("what must be proven for wrongful
+    termination?" is answered by the legal reference, which has no client
+    fields), so it only gives a filter for boosting their chunks.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.entity_vocabulary_path
+        self._lock = threading.RLock()
+        self._documents: Dict[str, Dict[str, str]] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self._documents)
+
+    def load(self) -> bool:
+        """Load the persisted vocabulary; returns False when there is none"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            documents = json.load(f)
+        with self._lock:
+            self._documents = documents
+        return True
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._documents, f)
+            os.replace(temp_path, self.path)
+
+    def add(self, filename: str, entities: Dict[str, str]):
+        with self._lock:
+            if entities:
+                self._documents[filename] = dict(entities)
+            else:
+                self._documents.pop(filename, None)
+
+    def remove(self, filename: str):
+        with self._lock:
+            self._documents.pop(filename, None)
+
+    def route(self, question: str) -> Optional[dict]:
+        """Metadata `where` filter for the clients named in `question`, or None"""
+        text = question.lower()
+        with self._lock:
+            entities = list(self._documents.values())
+
+        mentioned_ids = {match.upper() for match in _CLIENT_ID.findall(question)}
+        client_ids = {e["client_id"] for e in entities if e.get("client_id") in mentioned_ids}
+        client_ids |= {
+            e["client_id"] for e in entities
+            if e.get("client_id") and e.get("client_name") and _mentions(text, e["client_name"])
+        }
+        if not client_ids:
+            client_ids = self._match_surnames(text, entities)
+        if client_ids:
+            return _where("client_id", sorted(client_ids))
+        return None
+
+    def boost(self, question: str) -> Optional[dict]:
+        """Metadata `where` filter for the defendants, else case types, mentioned in `question`, or None"""
+        text = question.lower()
+        with self._lock:
+            entities = list(self._documents.values())
+
+        defendants = {e["defendant"] for e in entities if e.get("defendant") and _mentions(text, e["defendant"])}
+        if defendants:
+            return _where("defendant", sorted(defendants))
+
+        case_types = {e["case_type"] for e in entities if e.get("case_type") and _mentions(text, e["case_type"])}
+        if case_types:
+            return _where("case_type", sorted(case_types))
+        return None
+
+    @staticmethod
+    def _match_surnames(text: str, entities: List[Dict[str, str]]) -> set:
+        surnames: Dict[str, set] = {}
+        for e in entities:
+            if e.get("client_id") and e.get("client_name"):
+                surname = e["client_name"].split()[-1].lower()
+                surnames.setdefault(surname, set()).add(e["client_id"])
+        # An ambiguous surname doesn't identify anyone
+        return {
+            next(iter(ids)) for surname, ids in surnames.items()
+            if len(ids) == 1 and _mentions(text, surname)
+        }
+
+
+def _where(key: str, values: List[str]) -> dict:
+    if len(values) == 1:
+        return {key: values[0]}
+    return {key: {"$in": values}}
+
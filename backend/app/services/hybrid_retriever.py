@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import contextvars
+
+from langchain.callbacks.manager import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain.schema import BaseRetriever, Document
+
+from app.core.timing import stage
+from app.services.entities import EntityRouter
+from app.services.lexical_index import BM25Index
+from app.services.reranker import CrossEncoderReranker
+
+# Both retrievers of a query run side by side on this pool
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-retrieval")
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60) -> List[Document]:
+    """Merge ranked lists: each document scores sum(1 / (k + rank)) over the lists it appears in"""
+    scores: Dict[Tuple, float] = {}
+    documents: Dict[Tuple, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = (doc.metadata.get("filename"), doc.metadata.get("page"), doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense (vector store) + lexical (BM25) retrieval merged with reciprocal rank fusion.
+
+    Name and ID lookups ("LAW-005", "Michael Rodriguez") are where dense
+    search is weakest and BM25 is strongest; fusing the two rankings keeps
+    both kinds of match near the top without tuning score scales.
+
+    With a `router`, questions that name a known client are searched within
+    that client's chunks only, falling back to the whole collection when the
+    filtered search finds nothing. A mentioned defendant or case type
+    instead adds the fused ranking of a search within their chunks as a
+    third list, lifting them without hiding anything else. Without a
+    `lexical_index` only the dense ranking is used. With a `reranker`, the
+    top `rerank_candidates` of the fused ranking are rescored by the
+    cross-encoder and the best `k` kept.
+    """
+
+    vector_store: Any
+    lexical_index: Optional[BM25Index] = None
+    router: Optional[EntityRouter] = None
+    reranker: Optional[CrossEncoderReranker] = None
+    rerank_candidates: int = 20
+    k: int = 5
+    candidates: int = 20
+    rrf_k: int = 60
+
+    def _dense(self, query: str, where: Optional[dict]) -> List[Document]:
+        return self.vector_store.similarity_search(query, k=self.candidates, filter=where)
+
+    def _lexical(self, query: str, where: Optional[dict]) -> List[Document]:
+        if self.lexical_index is None:
+            return []
+        with stage("lexical_query"):
+            return [doc for doc, _ in self.lexical_index.search(query, k=self.candidates, where=where)]
+
+    def _route(self, query: str) -> Tuple[Optional[dict], Optional[dict]]:
+        """The hard filter for `query` and, without one, the filter of chunks to boost"""
+        if self.router is None:
+            return None, None
+        where = self.router.route(query)
+        return where, None if where else self.router.boost(query)
+
+    def _fuse(self, rankings: List[List[Document]]) -> List[Document]:
+        # rankings: dense and lexical, then the same within the boosted chunks if any
+        if len(rankings) > 2:
+            rankings = rankings[:2] + [reciprocal_rank_fusion(rankings[2:], self.rrf_k)]
+        return reciprocal_rank_fusion(rankings, self.rrf_k)
+
+    def _search(self, query: str, where: Optional[dict], boost: Optional[dict] = None) -> List[Document]:
+        searches = [(self._dense, where), (self._lexical, where)]
+        if boost:
+            searches += [(self._dense, boost), (self._lexical, boost)]
+        futures = [
+            _pool.submit(contextvars.copy_context().run, search, query, search_where)
+            for search, search_where in searches
+        ]
+        fused = self._fuse([future.result() for future in futures])
+        if self.reranker is None:
+            return fused[:self.k]
+        return self._rerank(query, fused)
+
+    async def _asearch(self, query: str, where: Optional[dict], boost: Optional[dict] = None) -> List[Document]:
+        searches = [(self._dense, where), (self._lexical, where)]
+        if boost:
+            searches += [(self._dense, boost), (self._lexical, boost)]
+        rankings = await asyncio.gather(*(
+            asyncio.to_thread(search, query, search_where) for search, search_where in searches
+        ))
+        fused = self._fuse(list(rankings))
+        if self.reranker is None:
+            return fused[:self.k]
+        return await asyncio.to_thread(self._rerank, query, fused)
+
+    def _rerank(self, query: str, fused: List[Document]) -> List[Document]:
+        with stage("rerank"):
+            return self.reranker.rerank(query, fused[:self.rerank_candidates], self.k)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        with stage("retrieve"):
+            where, boost = self._route(query)
+            documents = self._search(query, where, boost)
+            if where and not documents:
+                documents = self._search(query, None)
+            return documents
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        with stage("retrieve"):
+            where, boost = self._route(query)
+            documents = await self._asearch(query, where, boost)
+            if where and not documents:
+                documents = await self._asearch(query, None)
+            return documents
@@ -0,0 +1,280 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, List, Optional, Set
+import asyncio
+import os
+import uuid
+
+from app.core.config import settings
+from app.core.metrics import INGEST_QUEUE_DEPTH
+from app.services.bulk_ingest import BulkIngestPipeline, BulkIngestStats
+from app.services.document_catalog import DocumentCatalog
+from app.services.langchain_document_service import LangChainDocumentService
+from app.services.upload_storage import StoredUpload
+
+
+@dataclass
+class IngestionJob:
+    """Progress of one document being indexed in the background"""
+    id: str
+    filename: str
+    file_path: str
+    upload_path: Optional[str] = None  # Received data not yet moved to file_path
+    content_hash: Optional[str] = None
+    size_bytes: Optional[int] = None
+    status: str = "queued"  # queued, running, completed, failed
+    stage: str = "queued"  # queued, parsing, embedding, done
+    total_pages: Optional[int] = None
+    pages_processed: int = 0
+    total_chunks: Optional[int] = None
+    chunks_processed: int = 0
+    message: Optional[str] = None
+    duplicate_of: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def update(self, **updates):
+        """Progress callback handed to the document service"""
+        for name, value in updates.items():
+            setattr(self, name, value)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def store_upload(self):
+        """Move the received file into place, replacing any earlier upload of the same name"""
+        if self.upload_path:
+            os.replace(self.upload_path, self.file_path)
+            self.upload_path = None
+
+    def complete_as_duplicate(self, existing: str):
+        """Finish without indexing: the same content is indexed as `existing`.
+        
+        The received copy is dropped before it replaces anything, so a file
+        of the same name holding other, indexed content stays as it is.
+        """
+        if existing == self.filename:
+            message = "Document unchanged since it was last indexed."
+        else:
+            message = f"Document is identical to {existing}, which is already indexed."
+        self._remove_upload()
+        self.update(
+            status="completed",
+            stage="done",
+            duplicate_of=existing,
+            message=message,
+            finished_at=datetime.utcnow()
+        )
+
+    def fail(self, error: str):
+        self.update(status="failed", error=error, finished_at=datetime.utcnow())
+        # Clean up file on error; before it is stored, file_path is another upload's
+        if self.upload_path:
+            self._remove_upload()
+        elif os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def _remove_upload(self):
+        if self.upload_path and os.path.exists(self.upload_path):
+            os.remove(self.upload_path)
+        self.upload_path = None
+
+
+@dataclass
+class BulkIngestionJob:
+    """Many files indexed together by one bulk ingestion pipeline"""
+    id: str
+    files: List[IngestionJob]
+    status: str = "queued"  # queued, running, completed, failed
+    stats: BulkIngestStats = field(default_factory=BulkIngestStats)
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+
+class IngestionJobManager:
+    """Runs document ingestion in the background with bounded concurrency.
+
+    Jobs beyond `max_concurrent` wait in the queue; their status is kept in
+    memory until `history` newer jobs have finished. Each document's row in
+    the catalog follows its job, and content the catalog already holds is
+    not indexed again.
+    """
+
+    def __init__(
+        self,
+        document_service: LangChainDocumentService,
+        catalog: DocumentCatalog,
+        on_corpus_change: Callable[[], None] = None,
+        max_concurrent: int = None,
+        history: int = None
+    ):
+        self.document_service = document_service
+        self.catalog = catalog
+        self.on_corpus_change = on_corpus_change
+        self.history = history or settings.ingestion_job_history
+        self._slots = asyncio.Semaphore(max_concurrent or settings.max_concurrent_ingestions)
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._bulk_jobs: "OrderedDict[str, BulkIngestionJob]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        INGEST_QUEUE_DEPTH.set_function(lambda: self.queue_depth)
+
+    def submit(
+        self,
+        file_path: str,
+        filename: str,
+        content_hash: str = None,
+        size_bytes: int = None,
+        upload_path: str = None
+    ) -> IngestionJob:
+        """Queue a saved upload for ingestion and return its job.
+        
+        `upload_path` is where a received file waits until it is known not
+        to be a duplicate and is moved to `file_path`.
+        """
+        job = IngestionJob(
+            id=uuid.uuid4().hex,
+            filename=filename,
+            file_path=file_path,
+            upload_path=upload_path,
+            content_hash=content_hash,
+            size_bytes=size_bytes
+        )
+        self._jobs[job.id] = job
+        self._prune()
+
+        self._start(self._run(job))
+        return job
+
+    def submit_bulk(self, uploads: List[StoredUpload]) -> BulkIngestionJob:
+        """Queue received uploads for bulk ingestion.
+        
+        Each file also gets its own job, so its progress can be followed
+        like a single upload's.
+        """
+        bulk_job = BulkIngestionJob(
+            id=uuid.uuid4().hex,
+            files=[
+                IngestionJob(
+                    id=uuid.uuid4().hex,
+                    filename=upload.filename,
+                    file_path=upload.path,
+                    upload_path=upload.temp_path,
+                    content_hash=upload.sha256,
+                    size_bytes=upload.size_bytes
+                )
+                for upload in uploads
+            ]
+        )
+        for job in bulk_job.files:
+            self._jobs[job.id] = job
+        self._bulk_jobs[bulk_job.id] = bulk_job
+        self._prune()
+
+        self._start(self._run_bulk(bulk_job))
+        return bulk_job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def get_bulk(self, job_id: str) -> Optional[BulkIngestionJob]:
+        return self._bulk_jobs.get(job_id)
+
+    def _start(self, run):
+        task = asyncio.create_task(run)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == "queued")
+
+    async def _run(self, job: IngestionJob):
+        try:
+            # Identical content is recognized before any parsing
+            existing = await self.catalog.find_indexed(job.content_hash) if job.content_hash else None
+            if existing is not None:
+                job.complete_as_duplicate(existing)
+                return
+            job.store_upload()
+            await self.catalog.queued(job.filename, job.content_hash, job.size_bytes)
+        except Exception as e:
+            job.fail(str(e))
+            return
+
+        async with self._slots:
+            job.update(status="running", started_at=datetime.utcnow())
+            try:
+                await self.catalog.update(job.filename, status="indexing")
+                result = await self.document_service.process_document(
+                    job.file_path,
+                    job.filename,
+                    progress=job.update,
+                    content_hash=job.content_hash
+                )
+                await self.catalog.update(
+                    job.filename,
+                    content_hash=result["content_hash"],
+                    pages=result["pages"],
+                    chunks=result["chunks"],
+                    status="indexed",
+                    indexed_at=datetime.utcnow()
+                )
+                job.update(
+                    status="completed",
+                    stage="done",
+                    content_hash=result["content_hash"],
+                    pages_processed=result["pages"],
+                    chunks_processed=result["chunks"],
+                    message=result["message"]
+                )
+            except Exception as e:
+                job.fail(str(e))
+                try:
+                    await self.catalog.update(job.filename, status="failed", error=str(e))
+                except Exception:
+                    pass
+            finally:
+                job.finished_at = datetime.utcnow()
+                # Cached answers may be stale even if indexing only partly ran
+                if self.on_corpus_change:
+                    self.on_corpus_change()
+
+    async def _run_bulk(self, bulk_job: BulkIngestionJob):
+        # One slot for the whole run: the pipeline spreads it over every core
+        async with self._slots:
+            bulk_job.status = "running"
+            bulk_job.started_at = datetime.utcnow()
+            pipeline = BulkIngestPipeline(self.document_service, self.catalog)
+            bulk_job.stats = pipeline.stats
+            try:
+                await pipeline.run(bulk_job.files)
+                bulk_job.status = "completed"
+            except Exception as e:
+                bulk_job.status = "failed"
+                bulk_job.error = str(e)
+            finally:
+                bulk_job.finished_at = datetime.utcnow()
+                if self.on_corpus_change:
+                    self.on_corpus_change()
+
+    def _prune(self):
+        for jobs in (self._jobs, self._bulk_jobs):
+            finished = [job_id for job_id, job in jobs.items() if job.finished]
+            for job_id in finished[:max(0, len(finished) - self.history)]:
+                del jobs[job_id]
+
+    async def shutdown(self):
+        """Cancel jobs that are still queued or running"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -1,16 +1,24 @@
-from typing import List, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 import asyncio
+import logging
+import time
 
 from langchain.llms.base import LLM
-from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 from langchain.schema import Document
-from langchain.callbacks.manager import CallbackManagerForLLMRun
-import httpx
+from langchain.callbacks.manager import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.timing import record_stage, stage
 from app.models.schemas import SourceReference
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.conversation_memory import ConversationContext, ConversationMemory, chat_messages
 from app.services.langchain_document_service import LangChainDocumentService
+from app.services.ollama_client import OllamaError, get_ollama_client
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 class OllamaLLM(LLM):
     """Custom Ollama LLM for LangChain"""
@@ -19,6 +27,14 @@ class OllamaLLM(LLM):
     def _llm_type(self) -> str:
         return "ollama"
     
+    def _options(self, **kwargs) -> dict:
+        return {
+            "temperature": kwargs.get("temperature", 0.7),
+            "top_p": kwargs.get("top_p", 0.9),
+            "num_predict": kwargs.get("num_predict", 500),
+            "num_ctx": kwargs.get("num_ctx", settings.ollama_num_ctx)
+        }
+    
     def _call(
         self,
         prompt: str,
@@ -27,48 +43,72 @@ class OllamaLLM(LLM):
         **kwargs,
     ) -> str:
         """Call Ollama API synchronously"""
-        return asyncio.run(self._acall(prompt, stop, run_manager, **kwargs))
+        try:
+            result = get_ollama_client().generate_sync(prompt, self._options(**kwargs))
+            return result.get('response', 'Sorry, I could not generate a response.')
+        except OllamaError as e:
+            return f"AI service error: HTTP {e.status_code}"
+        except Exception as e:
+            return f"Error communicating with AI service: {str(e)}"
     
     async def _acall(
         self,
         prompt: str,
         stop: List[str] = None,
-        run_manager: CallbackManagerForLLMRun = None,
+        run_manager: AsyncCallbackManagerForLLMRun = None,
         **kwargs,
     ) -> str:
         """Call Ollama API asynchronously"""
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                payload = {
-                    "model": settings.ollama_model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": kwargs.get("temperature", 0.7),
-                        "top_p": kwargs.get("top_p", 0.9),
-                        "num_predict": kwargs.get("num_predict", 500),
-                        "num_ctx": kwargs.get("num_ctx", 2048)
-                    }
-                }
-                
-                response = await client.post(
-                    f"{settings.ollama_url}/api/generate",
-                    json=payload
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result.get('response', 'Sorry, I could not generate a response.')
-                else:
-                    return f"AI service error: HTTP {response.status_code}"
-                    
+            with stage("llm"):
+                result = await get_ollama_client().generate(prompt, self._options(**kwargs))
+            return result.get('response', 'Sorry, I could not generate a response.')
+        except OllamaError as e:
+            return f"AI service error: HTTP {e.status_code}"
+        except Exception as e:
+            return f"Error communicating with AI service: {str(e)}"
+    
+    async def achat(self, messages: List[dict], **kwargs) -> str:
+        """Answer a conversation through Ollama's chat API"""
+        try:
+            with stage("llm"):
+                result = await get_ollama_client().chat(messages, self._options(**kwargs))
+            return result.get("message", {}).get("content", 'Sorry, I could not generate a response.')
+        except OllamaError as e:
+            return f"AI service error: HTTP {e.status_code}"
         except Exception as e:
             return f"Error communicating with AI service: {str(e)}"
+    
+    async def astream_chat(self, messages: List[dict], **kwargs) -> AsyncIterator[str]:
+        """Stream response tokens from Ollama's chat API as they are generated"""
+        started = time.perf_counter()
+        first = True
+        try:
+            async for token in get_ollama_client().chat_stream(messages, self._options(**kwargs)):
+                if first:
+                    record_stage("llm_first_token", time.perf_counter() - started)
+                    first = False
+                yield token
+        finally:
+            record_stage("llm", time.perf_counter() - started)
+
+# Responses OllamaLLM returns instead of raising; never worth caching
+_ERROR_PREFIXES = ("AI service error", "Error communicating with AI service")
+
+# First message of every chat call. It never changes, so Ollama serves it
+# from its prompt cache for every session.
+ANSWER_INSTRUCTIONS = """You answer questions about legal case documents. Each question is followed by context retrieved from the documents. Answer based on that context and the conversation so far. Be direct and concise."""
 
 class LangChainChatService:
-    def __init__(self):
-        # Initialize document service
-        self.document_service = LangChainDocumentService()
+    def __init__(
+        self,
+        document_service: Optional[LangChainDocumentService] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None
+    ):
+        # Share the app-wide document service when one is given
+        self.document_service = document_service or LangChainDocumentService()
+        self.answer_cache = answer_cache
+        self.memory = ConversationMemory(ANSWER_INSTRUCTIONS) if settings.conversation_memory_enabled else None
         
         # Initialize LLM
         self.llm = OllamaLLM()
@@ -86,48 +126,67 @@ Question: {question}
 Answer:"""
         )
         
-        # Create retrieval QA chain
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=self.document_service.get_retriever(k=5, score_threshold=0.3),
-            return_source_documents=True,
-            chain_type_kwargs={
-                "prompt": self.prompt_template
-            }
-        )
+        self.retriever = self.document_service.get_retriever(k=5, score_threshold=0.3)
+        
+        self._answer_flights = SingleFlight("answer")
+        self._retrieval_flights = SingleFlight("retrieval")
+    
+    def forget_conversation(self, session_id: int):
+        """Drop what is kept in memory about a deleted session"""
+        if self.memory is not None:
+            self.memory.forget(session_id)
     
-    async def get_response(self, user_question: str) -> Tuple[str, List[SourceReference]]:
+    async def load_conversation(self, db: AsyncSession, session_id: int, before_message_id: int) -> Optional[ConversationContext]:
+        """Earlier turns of the session for answering a follow-up, or None when memory is off"""
+        if self.memory is None:
+            return None
+        return await self.memory.load(db, session_id, before_message_id)
+    
+    async def get_response(
+        self,
+        user_question: str,
+        conversation: Optional[ConversationContext] = None
+    ) -> Tuple[str, List[SourceReference]]:
         """Get AI response using LangChain RAG pipeline"""
         try:
-            # Run the QA chain
-            result = await asyncio.to_thread(
-                self.qa_chain,
-                {"query": user_question}
+            # Identical questions asked at the same time share one answer
+            return await self._answer_flights.do(
+                self._answer_key(user_question, conversation),
+                lambda: self._answer(user_question, conversation)
             )
-            
-            # Extract response and source documents
-            ai_response = result["result"]
-            source_documents = result.get("source_documents", [])
-            
-            # Convert source documents to SourceReference objects
-            sources = []
-            for doc in source_documents:
-                metadata = doc.metadata
-                sources.append(SourceReference(
-                    filename=metadata.get("filename", "unknown"),
-                    page=metadata.get("page", 1),
-                    content=doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content
-                ))
-            
-            print(f"LangChain QA Chain - Query: '{user_question}' - Retrieved {len(source_documents)} sources")
-            
-            return ai_response, sources
-            
         except Exception as e:
-            print(f"Error in LangChain chat service: {e}")
+            logger.exception("Answering failed")
             return f"Error processing your question: {str(e)}", []
     
+    async def _answer(
+        self,
+        user_question: str,
+        conversation: Optional[ConversationContext]
+    ) -> Tuple[str, List[SourceReference]]:
+        query = await self._standalone_question(user_question, conversation)
+        
+        # Serve rephrasings of recently answered questions from the cache
+        corpus_version = self.document_service.corpus_version
+        question_embedding = await self._embed_question(query, conversation)
+        if question_embedding is not None:
+            cached = self.answer_cache.lookup(question_embedding, corpus_version)
+            if cached:
+                logger.debug("Answer cache hit")
+                return cached
+        
+        # Retrieve with the standalone question, answer the one asked
+        source_documents = await self._retrieve(query)
+        ai_response = await self.llm.achat(self._messages(user_question, source_documents, conversation))
+        
+        # Convert source documents to SourceReference objects
+        sources = self._to_sources(source_documents)
+        
+        logger.debug("Answered", extra={"sources": len(source_documents)})
+        
+        self._cache_answer(question_embedding, query, ai_response, sources, corpus_version)
+        
+        return ai_response, sources
+    
     async def get_response_with_custom_retrieval(self, user_question: str, k: int = 5, score_threshold: float = 0.3) -> Tuple[str, List[SourceReference]]:
         """Get response with custom retrieval parameters"""
         try:
@@ -156,19 +215,124 @@ Answer:"""
             ai_response = await self.llm._acall(prompt)
             
             # Convert to source references
-            sources = []
-            for doc in relevant_docs:
-                metadata = doc.metadata
-                sources.append(SourceReference(
-                    filename=metadata.get("filename", "unknown"),
-                    page=metadata.get("page", 1),
-                    content=doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content
-                ))
+            sources = self._to_sources(relevant_docs)
             
-            print(f"Custom Retrieval - Query: '{user_question}' - Retrieved {len(relevant_docs)} sources")
+            logger.debug("Custom retrieval answered", extra={"sources": len(relevant_docs)})
             
             return ai_response, sources
             
         except Exception as e:
-            print(f"Error in custom retrieval: {e}")
-            return f"Error processing your question: {str(e)}", []
\ No newline at end of file
+            logger.exception("Custom retrieval failed")
+            return f"Error processing your question: {str(e)}", []
+    
+    async def stream_response(
+        self,
+        user_question: str,
+        conversation: Optional[ConversationContext] = None
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """Stream the RAG answer: yields ("sources", [SourceReference]) first, then ("token", str)"""
+        # Identical questions asked at the same time share one generation
+        stream = self._answer_flights.stream(
+            self._answer_key(user_question, conversation),
+            lambda: self._stream_answer(user_question, conversation)
+        )
+        async for item in stream:
+            yield item
+    
+    async def _stream_answer(
+        self,
+        user_question: str,
+        conversation: Optional[ConversationContext]
+    ) -> AsyncIterator[Tuple[str, object]]:
+        query = await self._standalone_question(user_question, conversation)
+        corpus_version = self.document_service.corpus_version
+        question_embedding = await self._embed_question(query, conversation)
+        if question_embedding is not None:
+            cached = self.answer_cache.lookup(question_embedding, corpus_version)
+            if cached:
+                logger.debug("Answer cache hit")
+                yield "sources", cached[1]
+                yield "token", cached[0]
+                return
+        
+        source_documents = await self._retrieve(query)
+        sources = self._to_sources(source_documents)
+        yield "sources", sources
+        
+        tokens = []
+        async for token in self.llm.astream_chat(self._messages(user_question, source_documents, conversation)):
+            tokens.append(token)
+            yield "token", token
+        
+        self._cache_answer(question_embedding, query, "".join(tokens), sources, corpus_version)
+        
+        logger.debug("Streamed answer", extra={"sources": len(source_documents)})
+    
+    def _answer_key(self, user_question: str, conversation: Optional[ConversationContext]) -> Optional[tuple]:
+        """Coalescing key for an answer; follow-ups depend on their session and are never shared"""
+        if not _shareable(conversation):
+            return None
+        return _normalize(user_question), self.document_service.corpus_version
+    
+    async def _retrieve(self, query: str) -> List[Document]:
+        """Retrieve for `query`, sharing the search with identical concurrent queries"""
+        return await self._retrieval_flights.do(
+            (_normalize(query), self.document_service.corpus_version),
+            lambda: self.retriever.aget_relevant_documents(query)
+        )
+    
+    async def _standalone_question(self, user_question: str, conversation: Optional[ConversationContext]) -> str:
+        """The question to retrieve and cache with: follow-ups rewritten to stand alone"""
+        if self.memory is None or conversation is None:
+            return user_question
+        return await self.memory.standalone_question(user_question, conversation)
+    
+    def _messages(self, user_question: str, documents: List[Document], conversation: Optional[ConversationContext]) -> List[dict]:
+        """Chat messages for the answer, with the newly retrieved context last"""
+        context = "\n\n".join(doc.page_content for doc in documents)
+        return chat_messages(ANSWER_INSTRUCTIONS, conversation, f"{user_question}\n\nContext:\n{context}")
+    
+    async def _embed_question(self, user_question: str, conversation: Optional[ConversationContext]) -> Optional[List[float]]:
+        """Embed the question for the answer cache, or None when caching is off or it is a follow-up.
+        
+        A follow-up's answer depends on its session, and its standalone
+        question may still be the raw follow-up (rewrite off or failed), so
+        it is neither looked up nor stored.
+        """
+        if self.answer_cache is None or not _shareable(conversation):
+            return None
+        with stage("embed"):
+            return await asyncio.to_thread(self.document_service.embeddings.embed_query, user_question)
+    
+    def _cache_answer(
+        self,
+        question_embedding: Optional[List[float]],
+        user_question: str,
+        ai_response: str,
+        sources: List[SourceReference],
+        corpus_version: int
+    ):
+        """Remember a successful answer for similar future questions"""
+        if question_embedding is None or not ai_response or ai_response.startswith(_ERROR_PREFIXES):
+            return
+        self.answer_cache.store(question_embedding, user_question, ai_response, sources, corpus_version)
+    
+    def _to_sources(self, documents: List[Document]) -> List[SourceReference]:
+        """Convert retrieved documents to SourceReference objects"""
+        sources = []
+        for doc in documents:
+            metadata = doc.metadata
+            sources.append(SourceReference(
+                filename=metadata.get("filename", "unknown"),
+                page=metadata.get("page", 1),
+                content=doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content
+            ))
+        return sources
+
+def _shareable(conversation: Optional[ConversationContext]) -> bool:
+    """Whether an answer can be shared across sessions: only for a first question"""
+    return conversation is None or conversation.empty
+
+def _normalize(question: str) -> str:
+    """Case, spacing and trailing punctuation don't change what is being asked"""
+    return " ".join(question.lower().split()).rstrip("?!. ")
@@ -1,26 +1,64 @@
-from typing import List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import asyncio
+import logging
 import os
+import threading
 from pathlib import Path
 
-from langchain.document_loaders import PyPDFLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import Chroma
 from langchain.embeddings.base import Embeddings
 from typing import List
 from langchain.schema import Document
-from chromadb.config import Settings as ChromaSettings
-import chromadb
 
 from app.core.config import settings
+from app.core.metrics import INGEST_CHUNKS_PER_SECOND, INGESTED_CHUNKS
+from app.services.chunk_ids import file_sha256
+from app.services.chunking import chunk_id, make_text_splitter, split_document
+from app.services.embedding_cache import CachedEmbeddings, EmbeddingCache
+from app.services.embedding_pipeline import BatchedIndexer
+from app.services.entities import ENTITY_FIELDS, EntityRouter
+from app.services.hybrid_retriever import HybridRetriever
+from app.services.lexical_index import BM25Index
+from app.services.pdf_extraction import ExtractedDocument, open_document
+from app.services.reranker import CrossEncoderReranker
+from app.services.vector_store import create_vector_store
 
+logger = logging.getLogger(__name__)
+
+
+def _no_progress(**updates):
+    pass
 
 class DefaultEmbeddings(Embeddings):
     """Simple wrapper for ChromaDB's default embedding function"""
     
-    def __init__(self):
+    def __init__(self, intra_op_threads: int = None):
         # Use ChromaDB's default embedding function without creating a client
         import chromadb.utils.embedding_functions
         self._embedding_function = chromadb.utils.embedding_functions.DefaultEmbeddingFunction()
+        
+        intra_op_threads = settings.embedding_intra_op_threads if intra_op_threads is None else intra_op_threads
+        if intra_op_threads:
+            self._set_intra_op_threads(intra_op_threads)
+    
+    def _set_intra_op_threads(self, threads: int):
+        """Reload the ONNX session with a fixed intra-op thread count.
+        
+        ChromaDB builds its InferenceSession with default options (one thread
+        per core), which oversubscribes CPUs when several ingestions run at
+        once, so swap in a session configured from settings.
+        """
+        function = self._embedding_function
+        function._download_model_if_not_exists()
+        function._init_model_and_tokenizer()
+        
+        options = function.ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        function.model = function.ort.InferenceSession(
+            os.path.join(function.DOWNLOAD_PATH, function.EXTRACTED_FOLDER_NAME, "model.onnx"),
+            sess_options=options,
+            providers=function._preferred_providers
+        )
     
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed a list of documents"""
@@ -32,125 +70,332 @@ class DefaultEmbeddings(Embeddings):
 
 class LangChainDocumentService:
     def __init__(self):
-        # Use ChromaDB's default embeddings (simpler and more reliable)
+        # Bumped whenever the indexed document set changes, from any ingestion thread
+        self.corpus_version = 0
+        self._corpus_lock = threading.Lock()
+        
+        # Use ChromaDB's default embeddings (simpler and more reliable),
+        # behind an on-disk cache so known chunk texts are never re-embedded
         self.embeddings = DefaultEmbeddings()
+        self.embedding_cache = None
+        if settings.embedding_cache_enabled:
+            self.embedding_cache = EmbeddingCache()
+            self.embeddings = CachedEmbeddings(self.embeddings, self.embedding_cache)
         
         # Initialize text splitter with smart chunking
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            separators=[
-                "\n\n",  # Double newlines (paragraphs)
-                "\nCASE DETAILS:",
-                "\nLEGAL ISSUES:",
-                "\nDAMAGES:",
-                "\nEMPLOYMENT DETAILS:",
-                "\nPERSONAL INFORMATION:",
-                "\nCLIENT ID:",
-                "\n",  # Single newlines
-                ". ",  # Sentences
-                " ",   # Words
-                ""     # Characters
-            ]
-        )
+        self.text_splitter = make_text_splitter()
         
-        # Initialize ChromaDB vector store with HTTP client
-        import chromadb
-        chroma_client = chromadb.HttpClient(
-            host=settings.chroma_url.replace('http://', '').replace('https://', '').split(':')[0],
-            port=int(settings.chroma_url.split(':')[-1])
-        )
+        # ChromaDB over HTTP, or the in-process store under data/ (settings.vector_backend)
+        self.vector_store = create_vector_store(self.embeddings)
+        
+        # BM25 index over the same chunks, kept in step with the collection
+        self.lexical_index = BM25Index()
+        self._load_lexical_index()
+        
+        # Entities of every indexed document, to route questions to their chunks
+        self.entity_router = EntityRouter()
+        self._load_entity_router()
         
-        self.vector_store = Chroma(
-            collection_name=settings.chroma_collection_name,
-            embedding_function=self.embeddings,
-            client=chroma_client
+        # Optional cross-encoder pass that keeps only the best few chunks
+        self.reranker = CrossEncoderReranker() if settings.rerank_enabled else None
+    
+    def _load_lexical_index(self):
+        """Load the persisted BM25 index, rebuilding it from the collection only if it's missing"""
+        if self.lexical_index.load():
+            return
+        total = self.vector_store.count()
+        for offset in range(0, total, 1000):
+            results = self.vector_store.get(offset=offset, limit=1000, include=["documents", "metadatas"])
+            self.lexical_index.add(results["ids"], results["documents"], results["metadatas"])
+        self.lexical_index.save()
+        if total:
+            logger.info("Rebuilt lexical index from the vector store", extra={"chunks": total})
+    
+    def _load_entity_router(self):
+        """Load the persisted entity vocabulary, rebuilding it from chunk metadata only if it's missing"""
+        if self.entity_router.load():
+            return
+        for offset in range(0, self.vector_store.count(), 1000):
+            for metadata in self.vector_store.get(offset=offset, limit=1000, include=["metadatas"])["metadatas"]:
+                entities = {key: metadata[key] for key in ENTITY_FIELDS if key in metadata}
+                if entities:
+                    self.entity_router.add(metadata["filename"], entities)
+        self.entity_router.save()
+    
+    def warm_up(self) -> dict:
+        """Load the embedding model and touch the collection so the first request doesn't pay for it"""
+        self.embeddings.embed_query("warm up")
+        if self.reranker is not None:
+            self.reranker.load()
+        return {
+            "collection": settings.chroma_collection_name,
+            "vector_backend": settings.vector_backend,
+            "chunks": self.vector_store.count(),
+            "lexical_index_chunks": self.lexical_index.size,
+            "entity_documents": self.entity_router.size,
+            "embedding_cache": self.embedding_cache.stats() if self.embedding_cache else None,
+            "reranker": self.reranker.stats() if self.reranker else None
+        }
+    
+    def close(self):
+        """Release the vector store's connections"""
+        self.vector_store.close()
+    
+    async def process_document(
+        self,
+        file_path: str,
+        filename: str,
+        progress: Optional[Callable[..., None]] = None,
+        content_hash: Optional[str] = None
+    ) -> dict:
+        """Process a document: extract pages, split them with LangChain and index the chunks.
+        
+        Parsing and embedding block, so the work runs in a worker thread.
+        `progress` is called with keyword updates (stage, total_pages,
+        pages_processed, total_chunks, chunks_processed) as work advances.
+        `content_hash` is the file's SHA-256 if the caller already knows it.
+        Recognizing content that is already indexed is up to the caller,
+        through the document catalog.
+        """
+        return await asyncio.to_thread(
+            self._process_document,
+            file_path,
+            filename,
+            progress or _no_progress,
+            content_hash
         )
     
-    async def process_document(self, file_path: str, filename: str) -> dict:
-        """Process a document using LangChain loaders and splitters"""
+    def _process_document(
+        self,
+        file_path: str,
+        filename: str,
+        progress: Callable[..., None],
+        content_hash: Optional[str]
+    ) -> dict:
+        indexing = False
         try:
-            # Load document based on file type
-            if filename.lower().endswith('.pdf'):
-                loader = PyPDFLoader(file_path)
-            elif filename.lower().endswith('.txt'):
-                loader = TextLoader(file_path, encoding='utf-8')
-            else:
-                raise ValueError(f"Unsupported file type: {filename}")
+            content_hash = content_hash or file_sha256(file_path)
+            indexing = True
             
-            # Load documents
-            documents = loader.load()
+            progress(stage="parsing")
+            chunk_ids = set()
+            entities = {}
+            with open_document(file_path, filename) as document:
+                pages = document.page_count
+                progress(total_pages=pages)
+                
+                # Chunks are produced lazily, so embedding starts with the first pages.
+                # Ids are deterministic, so chunks already in the store are skipped
+                # and the writes are idempotent upserts.
+                def embed(texts: List[str]) -> Tuple[List[List[float]], int, int]:
+                    # Embedding overlaps parsing from the first batch on
+                    progress(stage="embedding")
+                    return self.embed_texts(texts)
+                
+                indexer = BatchedIndexer(
+                    embed=embed,
+                    write=self.write_chunks,
+                    skip=self.skip_indexed_chunks
+                )
+                stats = indexer.run(
+                    self._iter_chunks(document, file_path, filename, content_hash, chunk_ids, entities, progress),
+                    on_batch_written=lambda batch_stats: progress(
+                        chunks_processed=batch_stats.chunks + batch_stats.skipped
+                    )
+                )
             
-            if not documents:
+            total_chunks = stats.chunks + stats.skipped
+            if not total_chunks:
                 raise ValueError(f"No content found in document: {filename}")
             
-            # Add filename to metadata for all documents
-            for doc in documents:
-                doc.metadata["filename"] = filename
-                # Ensure page number is set
-                if "page" not in doc.metadata:
-                    doc.metadata["page"] = 1
-            
-            # Split documents into chunks
-            chunks = self.text_splitter.split_documents(documents)
-            
-            if not chunks:
-                raise ValueError(f"No chunks created from document: {filename}")
+            # A replaced file leaves chunks of its previous version behind
+            stale_ids = self.remove_stale_chunks(filename, chunk_ids)
+            if stats.chunks or stale_ids:
+                self.bump_corpus_version()
+            self.lexical_index.save()
+            self.entity_router.add(filename, entities)
+            self.entity_router.save()
             
-            # Add to vector store
-            self.vector_store.add_documents(chunks)
+            hit_rate = stats.cache_hits / stats.chunks if stats.chunks else 1.0
+            if stats.chunks:
+                INGESTED_CHUNKS.inc(stats.chunks)
+                INGEST_CHUNKS_PER_SECOND.observe(stats.chunks_per_second)
+            logger.info(
+                "Indexed document",
+                extra={
+                    "document": filename,
+                    "chunks": stats.chunks,
+                    "batches": stats.batches,
+                    "already_indexed": stats.skipped,
+                    "stale_removed": stale_ids,
+                    "chunks_per_second": round(stats.chunks_per_second, 1),
+                    "embed_seconds": round(stats.embed_seconds, 3),
+                    "write_seconds": round(stats.write_seconds, 3),
+                    "embedding_cache_hit_rate": round(hit_rate, 3)
+                }
+            )
             
             return {
                 "filename": filename,
-                "pages": len(documents),
-                "chunks": len(chunks),
-                "message": f"Document processed successfully. {len(chunks)} chunks indexed."
+                "pages": pages,
+                "chunks": total_chunks,
+                "content_hash": content_hash,
+                "embedding_cache_hits": stats.cache_hits,
+                "embedding_cache_hit_rate": round(hit_rate, 3),
+                "chunks_per_second": round(stats.chunks_per_second, 1),
+                "message": f"Document processed successfully. {total_chunks} chunks indexed "
+                           f"({stats.cache_misses} newly embedded)."
             }
             
         except Exception as e:
+            # Don't leave a partial copy that would later pass as already indexed
+            if indexing:
+                try:
+                    self.discard_chunks(filename, content_hash)
+                except Exception:
+                    pass
             raise Exception(f"Error processing document {filename}: {str(e)}")
     
-    async def delete_document(self, filename: str) -> dict:
-        """Delete all chunks for a document from vector store"""
+    def _iter_chunks(
+        self,
+        document: ExtractedDocument,
+        file_path: str,
+        filename: str,
+        content_hash: str,
+        chunk_ids: Set[str],
+        entities: Dict[str, str],
+        progress: Callable[..., None]
+    ) -> Iterator[Document]:
+        """Extract page text with PyMuPDF and split each page as it arrives"""
+        for chunk in split_document(
+            document,
+            file_path,
+            filename,
+            content_hash,
+            self.text_splitter,
+            entities,
+            on_page=lambda pages, chunks: progress(pages_processed=pages, total_chunks=chunks)
+        ):
+            chunk_ids.add(chunk_id(chunk.metadata))
+            yield chunk
+        # Already embedding unless every chunk was indexed before
+        progress(stage="embedding")
+    
+    def skip_indexed_chunks(self, chunks: List[Document]) -> List[Document]:
+        """Drop chunks whose id is already in the vector store"""
+        ids = [chunk_id(chunk.metadata) for chunk in chunks]
+        existing = set(self.vector_store.get(ids=ids, include=[])["ids"])
+        return [chunk for chunk, id_ in zip(chunks, ids) if id_ not in existing]
+    
+    def write_chunks(self, chunks: List[Document], embeddings: List[List[float]]):
+        """Upsert one batch of embedded chunks into the vector store and the lexical index"""
+        ids = [chunk_id(chunk.metadata) for chunk in chunks]
+        metadatas = [chunk.metadata for chunk in chunks]
+        texts = [chunk.page_content for chunk in chunks]
+        self.vector_store.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=metadatas,
+            documents=texts
+        )
+        self.lexical_index.add(ids, texts, metadatas)
+    
+    def remove_stale_chunks(self, filename: str, current_ids: Set[str]) -> int:
+        """Delete chunks of `filename` that don't belong to its current content"""
+        indexed = self.vector_store.get(where={"filename": filename}, include=[])["ids"]
+        stale = [id_ for id_ in indexed if id_ not in current_ids]
+        if stale:
+            self.vector_store.delete(ids=stale)
+            self.lexical_index.remove(stale)
+        return len(stale)
+    
+    def discard_chunks(self, filename: str, content_hash: str):
+        """Delete the chunks written for this file's content, e.g. after indexing it failed.
+        
+        Another file with the same content keeps its chunks.
+        """
+        results = self.vector_store.get(where={"filename": filename}, include=["metadatas"])
+        ids = [
+            id_ for id_, metadata in zip(results["ids"], results["metadatas"])
+            if metadata.get("content_hash") == content_hash
+        ]
+        if ids:
+            self.vector_store.delete(ids=ids)
+        self.lexical_index.remove(self.lexical_index.ids_where(filename=filename, content_hash=content_hash))
+        self.lexical_index.save()
+    
+    def bump_corpus_version(self):
+        """Mark the indexed documents as changed, invalidating answers keyed by the old version"""
+        with self._corpus_lock:
+            self.corpus_version += 1
+    
+    def save_indexes(self):
+        """Persist the lexical index and entity vocabulary after a batch of changes"""
+        self.lexical_index.save()
+        self.entity_router.save()
+    
+    def embed_texts(self, texts: List[str]) -> Tuple[List[List[float]], int, int]:
+        """Embed chunk texts, returning (vectors, cache hits, cache misses)"""
+        if isinstance(self.embeddings, CachedEmbeddings):
+            return self.embeddings.embed_documents_with_stats(texts)
+        return self.embeddings.embed_documents(texts), 0, len(texts)
+    
+    async def delete_documents(self, filenames: Sequence[str]) -> int:
+        """Delete every chunk of these documents, returning how many were removed.
+        
+        Chunks go by a `where` filter on their filename, batched by
+        `settings.document_delete_batch_size`, so nothing is read back from
+        the vector store first. The blocking calls run in a worker thread.
+        """
+        return await asyncio.to_thread(self._delete_documents, list(filenames))
+    
+    def _delete_documents(self, filenames: List[str]) -> int:
+        removed = 0
+        batch_size = settings.document_delete_batch_size
         try:
-            # Get all document IDs for this filename
-            results = self.vector_store.get(
-                where={"filename": filename}
-            )
-            
-            if results['ids']:
-                # Delete the documents
-                self.vector_store.delete(ids=results['ids'])
-                return {
-                    "message": f"Document {filename} deleted successfully. Removed {len(results['ids'])} chunks."
-                }
-            else:
-                return {
-                    "message": f"No chunks found for document {filename}"
-                }
-                
-        except Exception as e:
-            raise Exception(f"Error deleting document {filename}: {str(e)}")
+            for start in range(0, len(filenames), batch_size):
+                where = {"filename": {"$in": filenames[start:start + batch_size]}}
+                self.vector_store.delete(where=where)
+                # The lexical index holds the same chunks, so it has the count
+                removed += self.lexical_index.remove_where(where)
+            for filename in filenames:
+                self.entity_router.remove(filename)
+        finally:
+            # Even a partial delete changes the corpus
+            self.bump_corpus_version()
+            self.lexical_index.save()
+            self.entity_router.save()
+        logger.info("Deleted documents", extra={"documents": len(filenames), "chunks": removed})
+        return removed
     
     def get_retriever(self, **kwargs):
-        """Get a retriever for the vector store"""
-        return self.vector_store.as_retriever(
-            search_type="similarity",
-            search_kwargs={
-                "k": kwargs.get("k", 5),
-                "score_threshold": kwargs.get("score_threshold", 0.3)
-            }
+        """Get a retriever: hybrid BM25 + vector search with entity routing and reranking, each optional in settings"""
+        k = kwargs.get("k", 5)
+        return HybridRetriever(
+            vector_store=self.vector_store,
+            lexical_index=self.lexical_index if settings.hybrid_retrieval_enabled else None,
+            router=self.entity_router if settings.entity_routing_enabled else None,
+            reranker=self.reranker,
+            rerank_candidates=settings.rerank_candidates,
+            # Reranked chunks are better ranked, so fewer of them are kept
+            k=min(k, settings.rerank_top_n) if self.reranker else k,
+            # Fusion and reranking need a deeper candidate list than the final k
+            candidates=settings.hybrid_candidates if settings.hybrid_retrieval_enabled or self.reranker else k,
+            rrf_k=settings.rrf_k
         )
     
     async def similarity_search(self, query: str, k: int = 5, score_threshold: float = 0.3) -> List[Document]:
         """Perform similarity search"""
         try:
-            # Use similarity search with score
+            # Use similarity search with score, within the chunks of the entities mentioned if any
+            where = self.entity_router.route(query) if settings.entity_routing_enabled else None
             results = self.vector_store.similarity_search_with_score(
                 query=query,
-                k=k
+                k=k,
+                filter=where
             )
+            if where and not results:
+                results = self.vector_store.similarity_search_with_score(query=query, k=k)
             
             # Filter by score threshold (lower score = more similar)
             filtered_results = []
@@ -160,47 +405,35 @@ class LangChainDocumentService:
                 if similarity >= score_threshold:
                     filtered_results.append(doc)
             
-            print(f"Query: '{query}' - Found {len(results)} results, {len(filtered_results)} passed score threshold {score_threshold}")
+            logger.debug(
+                "Similarity search",
+                extra={"results": len(results), "passed_threshold": len(filtered_results), "score_threshold": score_threshold}
+            )
             
             return filtered_results
             
         except Exception as e:
-            print(f"Error in similarity search: {e}")
+            logger.exception("Similarity search failed")
             return []
     
-    async def get_all_documents(self) -> List[dict]:
-        """Get metadata for all documents in the vector store"""
-        try:
-            # Get all documents
-            results = self.vector_store.get()
-            
-            # Group by filename to get document info
-            docs_info = {}
-            for i, metadata in enumerate(results['metadatas']):
-                filename = metadata.get('filename', 'unknown')
-                if filename not in docs_info:
-                    docs_info[filename] = {
-                        'filename': filename,
-                        'chunks': 0,
-                        'pages': set()
+    def indexed_documents(self) -> List[dict]:
+        """Chunk and page counts of every document, read from chunk metadata.
+        
+        This reads the metadata of every chunk in the collection, so it only
+        serves to fill the document catalog, which lists documents.
+        """
+        documents = {}
+        for offset in range(0, self.vector_store.count(), 1000):
+            for metadata in self.vector_store.get(offset=offset, limit=1000, include=["metadatas"])["metadatas"]:
+                filename = metadata.get("filename", "unknown")
+                if filename not in documents:
+                    documents[filename] = {
+                        "filename": filename,
+                        "content_hash": metadata.get("content_hash"),
+                        "chunks": 0,
+                        "pages": set()
                     }
-                docs_info[filename]['chunks'] += 1
-                if 'page' in metadata:
-                    docs_info[filename]['pages'].add(metadata['page'])
-            
-            # Convert to list format
-            document_list = []
-            for filename, info in docs_info.items():
-                document_list.append({
-                    'filename': filename,
-                    'chunks': info['chunks'],
-                    'pages': len(info['pages']) if info['pages'] else 1,
-                    'upload_date': None,  # ChromaDB doesn't store upload dates by default
-                    'size_mb': 0.0  # Would need to calculate from content
-                })
-            
-            return document_list
-            
-        except Exception as e:
-            print(f"Error getting documents: {e}")
-            return []
\ No newline at end of file
+                documents[filename]["chunks"] += 1
+                if "page" in metadata:
+                    documents[filename]["pages"].add(metadata["page"])
+        return [{**document, "pages": len(document["pages"]) or 1} for document in documents.values()]
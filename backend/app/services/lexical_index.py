@@ -0,0 +1,157 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import math
+import os
+import re
+import threading
+
+from langchain.schema import Document
+
+from app.core.config import settings
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the their this to was were what when "
+    "where which who why will with about our tell me".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def matches_where(metadata: dict, where: Optional[dict]) -> bool:
+    """Evaluate a flat `where` filter (equality or $in per key) against chunk metadata"""
+    if not where:
+        return True
+    for key, condition in where.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class BM25Index:
+    """In-process BM25 inverted index over chunk texts.
+
+    Kept alongside the vector store and updated incrementally as chunks are
+    written or deleted. It is persisted as JSON under `data/` (written to a
+    temp file and renamed), so a restart loads it instead of rebuilding.
+    """
+
+    def __init__(self, path: str = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path or settings.lexical_index_path
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._chunks: Dict[str, dict] = {}
+        self._total_length = 0
+        self._dirty = False
+
+    @property
+    def size(self) -> int:
+        return len(self._chunks)
+
+    def load(self) -> bool:
+        """Load the persisted index; returns False when there is none"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            self._postings = defaultdict(dict, data["postings"])
+            self._chunks = data["chunks"]
+            self._total_length = sum(chunk["length"] for chunk in self._chunks.values())
+            self._dirty = False
+        return True
+
+    def save(self):
+        """Persist the index if it changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"postings": self._postings, "chunks": self._chunks}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+            self._dirty = False
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[dict]):
+        """Index chunks, replacing any with the same ids"""
+        with self._lock:
+            self.remove([id_ for id_ in ids if id_ in self._chunks])
+            for id_, text, metadata in zip(ids, texts, metadatas):
+                counts = Counter(tokenize(text))
+                for term, count in counts.items():
+                    self._postings[term][id_] = count
+                length = sum(counts.values())
+                self._chunks[id_] = {"text": text, "metadata": metadata, "length": length, "terms": list(counts)}
+                self._total_length += length
+            self._dirty = True
+
+    def remove(self, ids: Iterable[str]):
+        """Drop chunks from the index; unknown ids are ignored"""
+        with self._lock:
+            for id_ in ids:
+                chunk = self._chunks.pop(id_, None)
+                if chunk is None:
+                    continue
+                for term in chunk["terms"]:
+                    postings = self._postings.get(term)
+                    if postings is not None:
+                        postings.pop(id_, None)
+                        if not postings:
+                            del self._postings[term]
+                self._total_length -= chunk["length"]
+                self._dirty = True
+
+    def remove_where(self, where: dict) -> int:
+        """Drop the chunks matching a `where` filter, returning how many were dropped"""
+        with self._lock:
+            ids = [id_ for id_, chunk in self._chunks.items() if matches_where(chunk["metadata"], where)]
+            self.remove(ids)
+            return len(ids)
+
+    def ids_where(self, **metadata) -> List[str]:
+        """Ids of chunks whose metadata matches all the given values"""
+        with self._lock:
+            return [
+                id_ for id_, chunk in self._chunks.items()
+                if all(chunk["metadata"].get(key) == value for key, value in metadata.items())
+            ]
+
+    def search(self, query: str, k: int = 5, where: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """Top-k chunks by BM25 score, optionally restricted to chunks matching `where`"""
+        terms = set(tokenize(query))
+        with self._lock:
+            if not terms or not self._chunks:
+                return []
+
+            count = len(self._chunks)
+            average_length = self._total_length / count
+            scores: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for id_, tf in postings.items():
+                    if where and not matches_where(self._chunks[id_]["metadata"], where):
+                        continue
+                    length = self._chunks[id_]["length"]
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[id_] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [
+                (Document(page_content=self._chunks[id_]["text"], metadata=dict(self._chunks[id_]["metadata"])), score)
+                for id_, score in best
+            ]
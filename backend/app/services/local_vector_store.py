@@ -0,0 +1,305 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import os
+import re
+import threading
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+
+from app.core.config import settings
+from app.services.lexical_index import matches_where
+from app.services.vector_store import ALL_INCLUDES, VectorStore
+
+try:
+    import hnswlib  # Ships with chromadb as chroma-hnswlib
+except ImportError:
+    hnswlib = None
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store persisted under `data/`, for single-node deployments.
+
+    Vectors live in `vectors.<gen>.f32`, an append-only float32 matrix that
+    is memory-mapped for search, and chunk ids, metadata and texts in
+    `records.<gen>.jsonl`, an append-only log replayed at startup. Vectors
+    are written before their log line, so a crash can at worst leave
+    unreferenced rows; a partial row or log line at the end is cut off on
+    load. Upserts and deletes only tombstone rows; once half
+    the rows are dead the files are rewritten as the next generation, and
+    `meta.json` is switched to it atomically.
+
+    Search is exact (NumPy over the mapped matrix) below
+    `local_vector_hnsw_min_size` live chunks and for filtered queries, and
+    goes through an in-memory HNSW graph, built from the matrix on first
+    use, above it. Meant for a single process.
+    """
+
+    def __init__(self, embeddings: Embeddings, directory: str = None, collection_name: str = None):
+        super().__init__(embeddings)
+        self.directory = os.path.join(
+            directory or settings.local_vector_store_dir,
+            re.sub(r'[^a-zA-Z0-9._-]', '_', collection_name or settings.chroma_collection_name)
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self._meta_path = os.path.join(self.directory, "meta.json")
+
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._row_ids: List[Optional[str]] = []  # None once a row is dead
+        self._records: List[Optional[Tuple[dict, str]]] = []
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._matrix = None
+        self._hnsw = None
+        self._load()
+
+    # Files
+
+    def _path(self, name: str, generation: int = None) -> str:
+        generation = self._generation if generation is None else generation
+        stem, extension = name.split(".")
+        return os.path.join(self.directory, f"{stem}.{generation}.{extension}")
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        self._generation = meta["generation"]
+        self._dim = meta["dim"]
+
+        # A crash mid-append leaves a partial row or log line at the end. Cut
+        # them off so later appends start on a boundary; rows after a partial
+        # one would be mapped shifted, and log lines appended to a partial
+        # one would never be replayed.
+        vectors_path = self._path("vectors.f32")
+        stored_rows = 0
+        if os.path.exists(vectors_path):
+            size = os.path.getsize(vectors_path)
+            stored_rows = size // (4 * self._dim)
+            if stored_rows * 4 * self._dim != size:
+                os.truncate(vectors_path, stored_rows * 4 * self._dim)
+        self._row_ids = [None] * stored_rows
+        self._records = [None] * stored_rows
+
+        records_path = self._path("records.jsonl")
+        if os.path.exists(records_path):
+            complete = 0
+            with open(records_path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # Torn last line
+                    if not line.endswith(b"\n"):
+                        break
+                    complete += len(line)
+                    if "delete" in entry:
+                        for id_ in entry["delete"]:
+                            self._kill(self._rows.pop(id_, None))
+                    elif entry["row"] < stored_rows:
+                        self._kill(self._rows.get(entry["id"]))
+                        self._rows[entry["id"]] = entry["row"]
+                        self._row_ids[entry["row"]] = entry["id"]
+                        self._records[entry["row"]] = (entry["metadata"], entry["document"])
+            if complete != os.path.getsize(records_path):
+                os.truncate(records_path, complete)
+
+        if stored_rows:
+            matrix = self._get_matrix()
+            self._norms = np.einsum("ij,ij->i", matrix, matrix).astype(np.float32)
+
+    def _write_meta(self):
+        temp_path = f"{self._meta_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"generation": self._generation, "dim": self._dim}, f)
+        os.replace(temp_path, self._meta_path)
+
+    def _get_matrix(self) -> np.ndarray:
+        # Remap once the file has grown past the mapped rows
+        rows = len(self._row_ids)
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(rows, self._dim))
+        return self._matrix
+
+    def _append_log(self, entries: List[dict]):
+        with open(self._path("records.jsonl"), "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+
+    def _kill(self, row: Optional[int]):
+        if row is None:
+            return
+        self._row_ids[row] = None
+        self._records[row] = None
+        if self._hnsw is not None:
+            self._hnsw.mark_deleted(row)
+
+    # VectorStore
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=ALL_INCLUDES) -> Dict[str, list]:
+        with self._lock:
+            if ids is not None:
+                rows = [self._rows[id_] for id_ in ids if id_ in self._rows]
+            else:
+                rows = [row for row, id_ in enumerate(self._row_ids) if id_ is not None]
+            if where:
+                rows = [row for row in rows if matches_where(self._records[row][0], where)]
+            rows = rows[offset or 0:]
+            if limit is not None:
+                rows = rows[:limit]
+
+            results = {"ids": [self._row_ids[row] for row in rows]}
+            if "metadatas" in include:
+                results["metadatas"] = [dict(self._records[row][0]) for row in rows]
+            if "documents" in include:
+                results["documents"] = [self._records[row][1] for row in rows]
+            return results
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        if not ids:
+            return
+        block = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            if self._dim is None:
+                self._dim = block.shape[1]
+                self._write_meta()
+
+            first_row = len(self._row_ids)
+            with open(self._path("vectors.f32"), "ab") as f:
+                f.write(block.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            entries = []
+            for offset, (id_, metadata, document) in enumerate(zip(ids, metadatas, documents)):
+                entries.append({"id": id_, "row": first_row + offset, "metadata": metadata, "document": document})
+            self._append_log(entries)
+
+            self._row_ids.extend([None] * len(entries))
+            self._records.extend([None] * len(entries))
+            self._norms = np.concatenate([self._norms, np.einsum("ij,ij->i", block, block)])
+            for entry in entries:
+                self._kill(self._rows.get(entry["id"]))
+                self._rows[entry["id"]] = entry["row"]
+                self._row_ids[entry["row"]] = entry["id"]
+                self._records[entry["row"]] = (entry["metadata"], entry["document"])
+
+            if self._hnsw is not None:
+                self._add_to_hnsw(block, np.arange(first_row, first_row + len(entries)))
+            self._maybe_compact()
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            ids = self.get(ids=ids, where=where, include=[])["ids"]
+            if not ids:
+                return
+            self._append_log([{"delete": ids}])
+            for id_ in ids:
+                self._kill(self._rows.pop(id_))
+            self._maybe_compact()
+
+    def query(self, embedding, k, where=None) -> List[Tuple[Document, float]]:
+        with self._lock:
+            if not self._rows:
+                return []
+            vector = np.asarray(embedding, dtype=np.float32)
+
+            if not where and len(self._rows) >= settings.local_vector_hnsw_min_size and hnswlib is not None:
+                rows, distances = self._query_hnsw(vector, min(k, len(self._rows)))
+            else:
+                if where:
+                    candidates = np.fromiter(
+                        (row for row, record in enumerate(self._records)
+                         if record is not None and matches_where(record[0], where)),
+                        dtype=np.int64
+                    )
+                else:
+                    candidates = np.fromiter(
+                        (row for row, id_ in enumerate(self._row_ids) if id_ is not None),
+                        dtype=np.int64
+                    )
+                rows, distances = self._query_exact(vector, candidates, k)
+
+            return [
+                (Document(page_content=self._records[row][1], metadata=dict(self._records[row][0])), float(distance))
+                for row, distance in zip(rows, distances)
+            ]
+
+    # Search
+
+    def _query_exact(self, vector: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if not len(candidates):
+            return candidates, np.zeros(0, dtype=np.float32)
+        matrix = self._get_matrix()
+        # Squared L2 as ||x||^2 + ||q||^2 - 2 x.q, like Chroma's default space
+        distances = self._norms[candidates] + vector @ vector - 2 * (matrix[candidates] @ vector)
+        if len(candidates) > k:
+            top = np.argpartition(distances, k)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(distances[top])]
+        return candidates[top], np.maximum(distances[top], 0.0)
+
+    def _query_hnsw(self, vector: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._hnsw is None:
+            self._build_hnsw()
+        self._hnsw.set_ef(max(k * 2, settings.local_vector_hnsw_ef))
+        rows, distances = self._hnsw.knn_query(vector, k=k)
+        return rows[0], distances[0]
+
+    def _build_hnsw(self):
+        live = np.fromiter((row for row, id_ in enumerate(self._row_ids) if id_ is not None), dtype=np.int64)
+        self._hnsw = hnswlib.Index(space="l2", dim=self._dim)
+        self._hnsw.init_index(max_elements=max(len(self._row_ids) * 2, 1024), ef_construction=200, M=16)
+        self._add_to_hnsw(self._get_matrix()[live], live)
+
+    def _add_to_hnsw(self, vectors: np.ndarray, rows: np.ndarray):
+        needed = int(rows.max()) + 1 if len(rows) else 0
+        if needed > self._hnsw.get_max_elements():
+            self._hnsw.resize_index(needed * 2)
+        self._hnsw.add_items(vectors, rows)
+
+    # Compaction
+
+    def _maybe_compact(self):
+        dead = len(self._row_ids) - len(self._rows)
+        if dead > 1024 and dead > len(self._rows):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite live rows into the next generation of files"""
+        live = [row for row, id_ in enumerate(self._row_ids) if id_ is not None]
+        generation = self._generation + 1
+        matrix = self._get_matrix()
+
+        with open(self._path("vectors.f32", generation), "wb") as f:
+            for start in range(0, len(live), 4096):
+                f.write(np.ascontiguousarray(matrix[live[start:start + 4096]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._path("records.jsonl", generation), "w", encoding="utf-8") as f:
+            for new_row, row in enumerate(live):
+                metadata, document = self._records[row]
+                f.write(json.dumps({"id": self._row_ids[row], "row": new_row, "metadata": metadata, "document": document}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        old_vectors, old_records = self._path("vectors.f32"), self._path("records.jsonl")
+        self._generation = generation
+        self._write_meta()
+        self._matrix = None
+        os.remove(old_vectors)
+        os.remove(old_records)
+
+        self._norms = self._norms[live]
+        self._row_ids = [self._row_ids[row] for row in live]
+        self._records = [self._records[row] for row in live]
+        self._rows = {id_: row for row, id_ in enumerate(self._row_ids)}
+        self._hnsw = None
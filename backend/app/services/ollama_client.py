@@ -0,0 +1,173 @@
+import httpx
+from typing import AsyncIterator, List, Optional
+import asyncio
+import json
+import threading
+
+from app.core.config import settings
+from app.core.metrics import LLM_IN_FLIGHT, LLM_QUEUED, PROMPT_EVAL_TOKENS
+
+
+class OllamaError(Exception):
+    """Raised when Ollama answers with an error"""
+
+    def __init__(self, status_code: int, detail: str):
+        self.status_code = status_code
+        self.detail = detail
+        super().__init__(f"AI service error: HTTP {status_code} - {detail}")
+
+
+class OllamaClient:
+    """Long-lived Ollama client shared by all chat services.
+
+    Connections are pooled and kept alive between calls, and the number of
+    generations in flight is capped so a burst of requests queues here instead
+    of overloading the Ollama server. The sync methods exist for LangChain's
+    blocking code path and use their own pool, so they never start an event loop.
+    """
+
+    def __init__(self, base_url: str = None, model: str = None):
+        self.base_url = base_url or settings.ollama_url
+        self.model = model or settings.ollama_model
+
+        limits = httpx.Limits(
+            max_connections=settings.ollama_max_connections,
+            max_keepalive_connections=settings.ollama_max_keepalive_connections,
+            keepalive_expiry=settings.ollama_keepalive_expiry
+        )
+        timeout = httpx.Timeout(settings.ollama_timeout, connect=10.0)
+
+        self._async_client = httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=timeout)
+        self._sync_client = httpx.Client(base_url=self.base_url, limits=limits, timeout=timeout)
+
+        self._async_slots = asyncio.Semaphore(settings.ollama_max_concurrent_generations)
+        self._sync_slots = threading.BoundedSemaphore(settings.ollama_max_concurrent_generations)
+
+    def _payload(self, stream: bool, options: Optional[dict], **body) -> dict:
+        return {
+            "model": self.model,
+            **body,
+            "stream": stream,
+            # Every call uses the same context size: Ollama reloads the model,
+            # dropping its prompt cache, when num_ctx changes between requests
+            "options": {"num_ctx": settings.ollama_num_ctx, **(options or {})},
+            "keep_alive": settings.ollama_keep_alive
+        }
+
+    async def generate(self, prompt: str, options: dict = None) -> dict:
+        """Run a generation and return Ollama's JSON response"""
+        return await self._request("/api/generate", self._payload(False, options, prompt=prompt))
+
+    async def generate_stream(self, prompt: str, options: dict = None) -> AsyncIterator[str]:
+        """Run a generation and yield response tokens as they arrive"""
+        async for token in self._stream("/api/generate", self._payload(True, options, prompt=prompt)):
+            yield token
+
+    async def chat(self, messages: List[dict], options: dict = None) -> dict:
+        """Run a chat completion and return Ollama's JSON response.
+
+        Ollama keeps the KV cache of the previous prompt and only evaluates
+        what follows the longest shared prefix, so callers should lay out
+        `messages` with the parts that change least first.
+        """
+        return await self._request("/api/chat", self._payload(False, options, messages=messages))
+
+    async def chat_stream(self, messages: List[dict], options: dict = None) -> AsyncIterator[str]:
+        """Run a chat completion and yield response tokens as they arrive"""
+        async for token in self._stream("/api/chat", self._payload(True, options, messages=messages)):
+            yield token
+
+    async def _request(self, path: str, payload: dict) -> dict:
+        with LLM_QUEUED.track_inprogress():
+            await self._async_slots.acquire()
+        try:
+            with LLM_IN_FLIGHT.track_inprogress():
+                response = await self._async_client.post(path, json=payload)
+        finally:
+            self._async_slots.release()
+        if response.status_code != 200:
+            raise OllamaError(response.status_code, response.text)
+        return _observed(response.json())
+
+    async def _stream(self, path: str, payload: dict) -> AsyncIterator[str]:
+        with LLM_QUEUED.track_inprogress():
+            await self._async_slots.acquire()
+        try:
+            with LLM_IN_FLIGHT.track_inprogress():
+                async for token in self._stream_tokens(path, payload):
+                    yield token
+        finally:
+            self._async_slots.release()
+
+    async def _stream_tokens(self, path: str, payload: dict) -> AsyncIterator[str]:
+        async with self._async_client.stream("POST", path, json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise OllamaError(response.status_code, response.text)
+
+            # Ollama streams one JSON object per line
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise OllamaError(response.status_code, chunk["error"])
+                # /api/generate streams `response`, /api/chat `message.content`
+                token = chunk.get("response") or chunk.get("message", {}).get("content")
+                if token:
+                    yield token
+                if chunk.get("done"):
+                    _observed(chunk)
+                    break
+
+    def generate_sync(self, prompt: str, options: dict = None) -> dict:
+        """Blocking variant of generate() for code running in worker threads"""
+        with LLM_QUEUED.track_inprogress():
+            self._sync_slots.acquire()
+        try:
+            with LLM_IN_FLIGHT.track_inprogress():
+                response = self._sync_client.post(
+                    "/api/generate",
+                    json=self._payload(False, options, prompt=prompt)
+                )
+        finally:
+            self._sync_slots.release()
+        if response.status_code != 200:
+            raise OllamaError(response.status_code, response.text)
+        return _observed(response.json())
+
+    async def aclose(self):
+        """Close all pooled connections"""
+        await self._async_client.aclose()
+        self._sync_client.close()
+
+
+def _observed(result: dict) -> dict:
+    """Record the prompt tokens Ollama reports evaluating in a final response.
+
+    With the prompt prefix reused between requests this is only the
+    uncached part, so it shows how much of each prompt was recomputed
+    rather than the prompt size.
+    """
+    if result.get("prompt_eval_count"):
+        PROMPT_EVAL_TOKENS.observe(result["prompt_eval_count"])
+    return result
+
+
+_client: Optional[OllamaClient] = None
+
+
+def get_ollama_client() -> OllamaClient:
+    """Get the process-wide Ollama client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = OllamaClient()
+    return _client
+
+
+async def close_ollama_client():
+    """Close the process-wide Ollama client"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,113 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+import multiprocessing
+import os
+
+import fitz  # PyMuPDF
+
+from app.core.config import settings
+
+
+@dataclass
+class ExtractedPage:
+    number: int  # 0-based page index
+    text: str
+
+
+class ExtractedDocument:
+    """A PDF or TXT file opened once for text extraction.
+
+    `page_count` is known as soon as the file is open, and iterating yields
+    pages in order as they are extracted, so chunking can start before the
+    whole file has been read. PDFs with at least `pdf_parallel_min_pages`
+    pages are split into page ranges extracted in a shared process pool;
+    each worker opens its own handle since PyMuPDF documents can't be shared
+    across processes. `parallel=False` always extracts in-process.
+    """
+
+    def __init__(self, file_path: str, filename: str = None, parallel: bool = True):
+        self.file_path = file_path
+        self.filename = filename or os.path.basename(file_path)
+        self.is_pdf = self.filename.lower().endswith('.pdf')
+        self.parallel = parallel
+        self._doc = None
+
+        if self.is_pdf:
+            self._doc = fitz.open(file_path)
+            self.page_count = len(self._doc)
+        elif self.filename.lower().endswith('.txt'):
+            # Text files have only one "page"
+            self.page_count = 1
+        else:
+            raise ValueError(f"Unsupported file type: {self.filename}")
+
+    def __iter__(self) -> Iterator[ExtractedPage]:
+        if not self.is_pdf:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                yield ExtractedPage(number=0, text=f.read())
+            return
+
+        if not self.parallel or self.page_count < settings.pdf_parallel_min_pages:
+            for number in range(self.page_count):
+                yield ExtractedPage(number=number, text=self._doc[number].get_text())
+            return
+
+        # Large PDF: extract page ranges in parallel, yield them in order
+        step = settings.pdf_pages_per_task
+        futures = [
+            get_extraction_pool().submit(_extract_range, self.file_path, start, min(start + step, self.page_count))
+            for start in range(0, self.page_count, step)
+        ]
+        try:
+            for future in futures:
+                for number, text in future.result():
+                    yield ExtractedPage(number=number, text=text)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    def __enter__(self) -> "ExtractedDocument":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_document(file_path: str, filename: str = None, parallel: bool = True) -> ExtractedDocument:
+    """Open a PDF or TXT file for page-by-page text extraction"""
+    return ExtractedDocument(file_path, filename, parallel)
+
+
+def _extract_range(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Process pool worker: extract text for pages [start, stop)"""
+    with fitz.open(file_path) as doc:
+        return [(number, doc[number].get_text()) for number in range(start, stop)]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """The process pool shared by all extraction work, started on first use"""
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that already runs threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.pdf_extraction_workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_extraction_pool():
+    """Stop the extraction worker processes, if any were started"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
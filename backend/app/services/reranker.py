@@ -0,0 +1,102 @@
+from typing import List, Optional
+import threading
+import time
+
+from langchain.schema import Document
+
+from app.core.config import settings
+
+_PROBE_INTERVAL = 20
+
+
+class CrossEncoderReranker:
+    """Reorders retrieved chunks with a local cross-encoder, within a time budget.
+
+    Pairs are scored on CPU in batches of `batch_size`. Before starting, the
+    cost is estimated from the measured time per pair of earlier calls; if it
+    would exceed `budget_ms` the stage is skipped and the incoming order is
+    kept. A run that overshoots anyway stops between batches and falls back
+    the same way. Every `_PROBE_INTERVAL`th skipped call is attempted anyway,
+    so an estimate inflated by a slow spell can recover. One prediction runs
+    at a time so concurrent requests don't fight over the cores; time spent
+    waiting for it counts against the budget.
+    """
+
+    def __init__(
+        self,
+        model_name: str = None,
+        top_n: int = None,
+        batch_size: int = None,
+        budget_ms: float = None
+    ):
+        self.model_name = model_name or settings.rerank_model_name
+        self.top_n = top_n or settings.rerank_top_n
+        self.batch_size = batch_size or settings.rerank_batch_size
+        self.budget_ms = budget_ms if budget_ms is not None else settings.rerank_budget_ms
+
+        self._model = None
+        self._lock = threading.Lock()
+        self._ms_per_pair: Optional[float] = None
+        self._skips_in_a_row = 0
+
+        self.reranked = 0
+        self.skipped = 0
+
+    def load(self):
+        """Load the model, and time a first batch to seed the cost estimate"""
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model_name, device="cpu")
+                pairs = [("warm up", "warm up")] * self.batch_size
+                self._model.predict(pairs, batch_size=self.batch_size)
+                # The first call pays one-off setup costs; time the second
+                started = time.perf_counter()
+                self._model.predict(pairs, batch_size=self.batch_size)
+                self._ms_per_pair = (time.perf_counter() - started) * 1000 / self.batch_size
+
+    def rerank(self, query: str, documents: List[Document], top_n: int = None) -> List[Document]:
+        """Top `top_n` documents by cross-encoder score, or the first `top_n` as given if over budget"""
+        top_n = top_n or self.top_n
+        if len(documents) <= 1:
+            return documents[:top_n]
+        if self._ms_per_pair is not None and self._ms_per_pair * len(documents) > self.budget_ms:
+            self._skips_in_a_row += 1
+            if self._skips_in_a_row % _PROBE_INTERVAL:
+                self.skipped += 1
+                return documents[:top_n]
+
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        self.load()
+        scores = []
+        with self._lock:
+            started = time.perf_counter()
+            for start in range(0, len(documents), self.batch_size):
+                if time.perf_counter() > deadline:
+                    if scores:
+                        self._observe((time.perf_counter() - started) * 1000, len(scores))
+                    self.skipped += 1
+                    return documents[:top_n]
+                pairs = [(query, doc.page_content) for doc in documents[start:start + self.batch_size]]
+                scores.extend(float(score) for score in self._model.predict(pairs, batch_size=self.batch_size))
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self._observe(elapsed_ms, len(documents))
+        self.reranked += 1
+        self._skips_in_a_row = 0
+
+        ranked = sorted(zip(scores, range(len(documents))), key=lambda item: item[0], reverse=True)
+        return [documents[index] for _, index in ranked[:top_n]]
+
+    def _observe(self, elapsed_ms: float, pairs: int):
+        # Smooth the per-pair cost over calls; it drives the next skip decision
+        self._ms_per_pair = 0.8 * self._ms_per_pair + 0.2 * elapsed_ms / pairs
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "reranked": self.reranked,
+            "skipped": self.skipped,
+            "ms_per_pair": round(self._ms_per_pair, 2) if self._ms_per_pair is not None else None
+        }
@@ -1,10 +1,13 @@
 import httpx
 import json
+import logging
 from typing import List, Dict, Any, Optional
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 class SimpleChromaDB:
     """ChromaDB client using the official Python client library"""
     
@@ -30,38 +33,36 @@ class SimpleChromaDB:
         except Exception as e:
             try:
                 # Create collection if it doesn't exist
-                print(f"Creating collection '{self.collection_name}'")
+                logger.info("Creating collection", extra={"collection": self.collection_name})
                 self.collection = self.client.create_collection(
                     name=self.collection_name,
                     metadata={"description": "Document embeddings for RAG"}
                 )
                 return True
             except Exception as create_error:
-                print(f"Error creating collection: {create_error}")
+                logger.warning("Creating collection failed: %s", create_error)
                 return False
     
     async def add_documents(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]) -> bool:
-        """Add documents to collection"""
+        """Add documents to collection, replacing any with the same ids"""
         if not await self.ensure_collection_exists():
-            print("Failed to ensure collection exists")
+            logger.warning("Failed to ensure collection exists")
             return False
             
         try:
-            print(f"Adding {len(documents)} documents to ChromaDB collection")
-            print(f"Sample IDs: {ids[:2] if ids else []}")
+            logger.debug("Adding documents to ChromaDB", extra={"documents": len(documents), "sample_ids": ids[:2]})
             
-            # Use the Python client to add documents
-            self.collection.add(
+            # Upsert so re-processing a file doesn't duplicate its chunks
+            self.collection.upsert(
                 documents=documents,
                 metadatas=metadatas,
                 ids=ids
             )
             
-            print("Successfully added documents to ChromaDB")
             return True
             
         except Exception as e:
-            print(f"Error adding documents to ChromaDB: {e}")
+            logger.exception("Adding documents to ChromaDB failed")
             return False
     
     async def query_documents(self, query_text: str, n_results: int = 5, similarity_threshold: float = 0.7) -> Dict[str, Any]:
@@ -100,7 +101,10 @@ class SimpleChromaDB:
                         if len(filtered_docs) >= n_results:
                             break
                 
-                print(f"Query: '{query_text}' - Found {len(distances)} results, {len(filtered_docs)} passed similarity threshold {similarity_threshold}")
+                logger.debug(
+                    "ChromaDB query",
+                    extra={"results": len(distances), "passed_threshold": len(filtered_docs), "similarity_threshold": similarity_threshold}
+                )
                 
                 return {
                     'documents': [filtered_docs],
@@ -112,7 +116,7 @@ class SimpleChromaDB:
                 return results
                 
         except Exception as e:
-            print(f"Error querying ChromaDB: {e}")
+            logger.exception("Querying ChromaDB failed")
             return {'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
     
     async def delete_documents(self, ids: List[str]) -> bool:
@@ -124,7 +128,7 @@ class SimpleChromaDB:
             self.collection.delete(ids=ids)
             return True
         except Exception as e:
-            print(f"Error deleting documents from ChromaDB: {e}")
+            logger.exception("Deleting documents from ChromaDB failed")
             return False
     
     async def get_documents_by_metadata(self, where: Dict[str, Any]) -> Dict[str, Any]:
@@ -136,5 +140,5 @@ class SimpleChromaDB:
             results = self.collection.get(where=where)
             return results
         except Exception as e:
-            print(f"Error getting documents from ChromaDB: {e}")
+            logger.exception("Getting documents from ChromaDB failed")
             return {'ids': [], 'documents': [], 'metadatas': []}
\ No newline at end of file
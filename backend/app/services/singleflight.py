@@ -0,0 +1,127 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+import asyncio
+import time
+
+from app.core.metrics import COALESCED_REQUESTS
+from app.core.timing import record_stage
+
+T = TypeVar("T")
+
+
+class _Broadcast:
+    """One source stream replayed to any number of subscribers.
+
+    Items are buffered for the life of the stream, so a subscriber joining
+    late first catches up on what it missed, then follows along live.
+    """
+
+    def __init__(self, source: AsyncIterator):
+        self.items: List = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        # Runs in the first subscriber's context, so its stages are timed there
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator):
+        try:
+            async for item in source:
+                self.items.append(item)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def subscribe(self) -> AsyncIterator:
+        position = 0
+        while True:
+            while position < len(self.items):
+                yield self.items[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class SingleFlight:
+    """Shares one in-flight computation among concurrent callers with the same key.
+
+    The computation runs as its own task, so a caller going away doesn't
+    cancel it for the others. Nothing is kept once it finishes: a request
+    arriving after that starts a new one. A key of None opts out.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key: Optional[Hashable], compute: Callable[[], Awaitable[T]]) -> T:
+        """The result of `compute()`, or of the identical call already running"""
+        if key is None:
+            return await compute()
+
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(self._calls, key, done))
+            return await asyncio.shield(task)
+
+        COALESCED_REQUESTS.labels(self.name).inc()
+        started = time.perf_counter()
+        try:
+            return await asyncio.shield(task)
+        finally:
+            record_stage("coalesced_wait", time.perf_counter() - started)
+
+    async def stream(self, key: Optional[Hashable], produce: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """The items of `produce()`, or of the identical stream already running.
+
+        The source stream is cancelled once every subscriber has gone.
+        """
+        if key is None:
+            async for item in produce():
+                yield item
+            return
+
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast(produce())
+            self._streams[key] = broadcast
+            broadcast.task.add_done_callback(lambda done: self._finished(self._streams, key, broadcast))
+        else:
+            COALESCED_REQUESTS.labels(self.name).inc()
+
+        broadcast.subscribers += 1
+        try:
+            async for item in broadcast.subscribe():
+                yield item
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                broadcast.task.cancel()
+                # Anyone asking from now on needs a fresh, complete stream
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+
+    def _finished(self, flights: dict, key: Hashable, flight):
+        # A newer flight may already be registered under the same key
+        if flights.get(key) is flight:
+            del flights[key]
+        if isinstance(flight, asyncio.Task) and not flight.cancelled():
+            # Mark the exception retrieved when every caller has gone
+            flight.exception()
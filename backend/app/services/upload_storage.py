@@ -0,0 +1,203 @@
+from dataclasses import dataclass
+from fastapi import Request
+from typing import Callable, List, Optional, Tuple
+import hashlib
+import os
+import uuid
+
+import aiofiles
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+class InvalidUploadError(Exception):
+    """Raised when a request body is not a multipart upload that can be accepted"""
+
+
+@dataclass
+class StoredUpload:
+    filename: str
+    path: str  # Where the file belongs in the upload directory
+    temp_path: str  # Where its data is until it is moved to `path`
+    size_bytes: int
+    sha256: str
+
+
+class _PendingUpload:
+    """A file part being written to a temporary file in the upload directory"""
+
+    def __init__(self, filename: str, upload_dir: str, max_bytes: int):
+        self.filename = filename
+        self.final_path = os.path.join(upload_dir, filename)
+        self.temp_path = os.path.join(upload_dir, f".{filename}.{uuid.uuid4().hex}.part")
+        self.max_bytes = max_bytes
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.file = None
+
+    async def open(self):
+        self.file = await aiofiles.open(self.temp_path, 'wb')
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(
+                f"File size exceeds {self.max_bytes // (1024 * 1024)}MB limit: {self.filename}"
+            )
+        self.digest.update(data)
+        await self.file.write(data)
+
+    async def close(self):
+        if self.file is not None:
+            await self.file.close()
+            self.file = None
+
+    def stored(self) -> StoredUpload:
+        return StoredUpload(
+            filename=self.filename,
+            path=self.final_path,
+            temp_path=self.temp_path,
+            size_bytes=self.size,
+            sha256=self.digest.hexdigest()
+        )
+
+
+class _PartEvents:
+    """Multipart parser callbacks, recorded so the async side can act on them.
+
+    The parser calls back synchronously; file writes have to be awaited, so
+    each chunk fed to it yields a list of ("begin", filename), ("data",
+    bytes) and ("end", None) events for the file parts of `field_name`.
+    Other parts are skipped.
+    """
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self.events: List[Tuple[str, object]] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_file = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end
+        }
+
+    def on_part_begin(self):
+        self._disposition = b""
+        self._in_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if _decode(options.get(b"name", b"")) != self.field_name or b"filename" not in options:
+            return
+        self._in_file = True
+        self.events.append(("begin", os.path.basename(_decode(options[b"filename"]))))
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.events.append(("data", data[start:end]))
+
+    def on_part_end(self):
+        if self._in_file:
+            self.events.append(("end", None))
+            self._in_file = False
+
+
+def _decode(value: bytes) -> str:
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+
+async def receive_uploads(
+    request: Request,
+    field_name: str,
+    accept: Callable[[str], None],
+    max_files: int,
+    upload_dir: str = None,
+    max_bytes: int = None
+) -> List[StoredUpload]:
+    """Stream the files of a multipart request body straight to the upload directory.
+
+    Unlike an `UploadFile` parameter, nothing is spooled first: each file
+    part is written to a temporary file as its bytes arrive, with the size
+    limit enforced and the SHA-256 computed along the way, so a file over
+    the limit is refused as soon as it crosses it. `accept` is called with
+    each file name before any of its data is written and raises to refuse
+    it. On any error the temporary files are removed.
+
+    The files are left at their `temp_path`: whoever indexes them moves
+    them into place once they are known not to be duplicates, so a
+    duplicate never overwrites a different document of the same name.
+    """
+    upload_dir = upload_dir or settings.upload_dir
+    max_bytes = max_bytes or settings.max_file_size_mb * 1024 * 1024
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise InvalidUploadError("Expected a multipart/form-data body")
+
+    parts = _PartEvents(field_name)
+    parser = MultipartParser(params[b"boundary"], parts.callbacks())
+    uploads: List[_PendingUpload] = []
+    current: Optional[_PendingUpload] = None
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise InvalidUploadError(f"Malformed multipart body: {e}")
+            for event, value in parts.events:
+                if event == "begin":
+                    if len(uploads) == max_files:
+                        raise InvalidUploadError(f"Too many files, the limit is {max_files} per upload")
+                    if any(upload.filename == value for upload in uploads):
+                        raise InvalidUploadError("Filenames must be unique")
+                    accept(value)
+                    current = _PendingUpload(value, upload_dir, max_bytes)
+                    uploads.append(current)
+                    await current.open()
+                elif event == "data":
+                    await current.write(value)
+                else:
+                    await current.close()
+                    current = None
+            parts.events.clear()
+        parser.finalize()
+        if current is not None:
+            raise InvalidUploadError("Request body ended in the middle of a file")
+    except BaseException:
+        for upload in uploads:
+            await upload.close()
+            if os.path.exists(upload.temp_path):
+                os.remove(upload.temp_path)
+        raise
+
+    return [upload.stored() for upload in uploads]
@@ -0,0 +1,130 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+import chromadb
+
+from app.core.config import settings
+from app.core.timing import stage
+
+ALL_INCLUDES = ("metadatas", "documents")
+
+
+class VectorStore(ABC):
+    """Chunk storage and nearest-neighbour search used by the document service.
+
+    Results follow Chroma's conventions whatever the backend: `get` returns
+    a dict of parallel `ids` / `metadatas` / `documents` lists, filters use
+    Chroma's `where` syntax, and scores are squared L2 distances (lower is
+    more similar).
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Optional[dict] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ALL_INCLUDES
+    ) -> Dict[str, list]:
+        ...
+
+    @abstractmethod
+    def upsert(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Sequence[dict],
+        documents: Sequence[str]
+    ):
+        ...
+
+    @abstractmethod
+    def delete(self, ids: Optional[Sequence[str]] = None, where: Optional[dict] = None):
+        ...
+
+    @abstractmethod
+    def query(self, embedding: Sequence[float], k: int, where: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """The `k` nearest chunks to `embedding` with their distances"""
+
+    def close(self):
+        pass
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None
+    ) -> List[Tuple[Document, float]]:
+        with stage("embed"):
+            embedding = self.embeddings.embed_query(query)
+        with stage("vector_query"):
+            return self.query(embedding, k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+
+class ChromaVectorStore(VectorStore):
+    """Collection on the ChromaDB server, reached over HTTP"""
+
+    def __init__(self, embeddings: Embeddings, collection_name: str = None):
+        super().__init__(embeddings)
+        self.client = chromadb.HttpClient(
+            host=settings.chroma_url.replace('http://', '').replace('https://', '').split(':')[0],
+            port=int(settings.chroma_url.split(':')[-1])
+        )
+        # Embeddings are computed by the service, never by the server
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name or settings.chroma_collection_name,
+            embedding_function=None
+        )
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=ALL_INCLUDES) -> Dict[str, list]:
+        return self.collection.get(ids=ids, where=where, limit=limit, offset=offset, include=list(include))
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        self.collection.upsert(ids=list(ids), embeddings=list(embeddings), metadatas=list(metadatas), documents=list(documents))
+
+    def delete(self, ids=None, where=None):
+        self.collection.delete(ids=ids, where=where)
+
+    def query(self, embedding, k, where=None) -> List[Tuple[Document, float]]:
+        results = self.collection.query(
+            query_embeddings=[[float(value) for value in embedding]],
+            n_results=k,
+            where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            (Document(page_content=text, metadata=metadata or {}), distance)
+            for text, metadata, distance in zip(
+                results["documents"][0], results["metadatas"][0], results["distances"][0]
+            )
+        ]
+
+    def close(self):
+        """Release the HTTP connections held by the client"""
+        session = getattr(getattr(self.client, "_server", None), "_session", None)
+        if session is not None:
+            session.close()
+
+
+def create_vector_store(embeddings: Embeddings, backend: str = None) -> VectorStore:
+    """Vector store for `settings.vector_backend` ("chroma" or "local")"""
+    backend = backend or settings.vector_backend
+    if backend == "chroma":
+        return ChromaVectorStore(embeddings)
+    if backend == "local":
+        from app.services.local_vector_store import LocalVectorStore
+        return LocalVectorStore(embeddings)
+    raise ValueError(f"Unknown vector backend: {backend}")
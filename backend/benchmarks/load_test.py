@@ -0,0 +1,415 @@
+"""End-to-end load test of the RAG Chat API.
+
+Starts the stub Ollama server, an ephemeral ChromaDB (or the local vector
+backend) and the API itself in a temporary working directory, uploads
+synthetic client files, then replays the questions in `questions.txt`
+against the chat endpoints at a fixed concurrency. Run from the backend
+directory:
+
+    python -m benchmarks.load_test --concurrency 8 --requests 200 --output results.json
+    python -m benchmarks.load_test --baseline results.json --max-regression 10
+
+Reports p50/p95/p99 latency per endpoint, per pipeline stage (from the
+API's Server-Timing header) and time to first token for streamed answers,
+and writes them as JSON. With `--baseline`, percentiles are compared to an
+earlier run and the exit status is 1 if any p95 grew by more than
+`--max-regression` percent (and at least 1 ms). `--target` points the
+load at an API that is already running instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+QUESTIONS_FILE = BACKEND_DIR.parent / "questions.txt"
+
+CASE_TYPES = ["Wrongful Termination", "Contract Dispute", "Wage and Hour", "Discrimination", "Trade Secrets"]
+FIRST_NAMES = ["Maria", "John", "Aisha", "Wei", "Carlos", "Emma", "Noah", "Priya", "Omar", "Grace"]
+LAST_NAMES = ["Lopez", "Nguyen", "Okafor", "Schmidt", "Patel", "Russo", "Kowalski", "Haddad", "Berg", "Tanaka"]
+
+
+class Recorder:
+    """Latency samples in milliseconds, keyed by endpoint and by stage"""
+
+    def __init__(self):
+        self.endpoints: Dict[str, List[float]] = defaultdict(list)
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, started: float, response: Optional[httpx.Response] = None):
+        self.endpoints[endpoint].append((time.perf_counter() - started) * 1000)
+        if response is None or response.status_code >= 400:
+            self.errors[endpoint] += 1
+            return
+        for part in response.headers.get("server-timing", "").split(","):
+            name, _, duration = part.strip().partition(";dur=")
+            if name and duration and name != "total":
+                self.stages[name].append(float(duration))
+
+
+def percentiles(samples: List[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(pct: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))], 2)
+
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 2),
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+        "max": round(ordered[-1], 2)
+    }
+
+
+def load_questions() -> List[str]:
+    lines = QUESTIONS_FILE.read_text(encoding="utf-8").splitlines()
+    return [line.lstrip("• ").strip() for line in lines if line.startswith("•")]
+
+
+def synthetic_client_file(number: int) -> str:
+    rng = random.Random(number)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    case_type = rng.choice(CASE_TYPES)
+    amount = rng.randrange(20, 400) * 1000
+    details = " ".join(
+        f"Paragraph {i}: the {case_type.lower()} claim of {name} involves events documented in exhibit {i}, "
+        f"with damages estimated at ${amount + i * 500:,} and witnesses available for deposition."
+        for i in range(rng.randrange(8, 30))
+    )
+    return (
+        f"CONFIDENTIAL ATTORNEY-CLIENT PRIVILEGED\nCLIENT FILE: {name.upper()}\n"
+        f"Client ID:\nLOAD-{number:04d}\nFull Name:\n{name}\n"
+        f"Employer/Defendant:\n{rng.choice(LAST_NAMES)} Holdings LLC\nCase Type:\n{case_type}\n"
+        f"Settlement Demand:\n${amount:,}\n\nCASE DETAILS AND ANALYSIS\n{details}\n"
+    )
+
+
+# Stand-in services
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url, timeout=2.0)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+class Stack:
+    """The API and its stand-in dependencies as subprocesses in a temporary directory"""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = Path(tempfile.mkdtemp(prefix="rag_load_test_"))
+        self.processes: List[subprocess.Popen] = []
+
+    def _spawn(self, command: List[str], env: dict = None, cwd: Path = None) -> subprocess.Popen:
+        log = open(self.workdir / f"{len(self.processes)}.log", "w")
+        process = subprocess.Popen(command, cwd=cwd or BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        self.processes.append(process)
+        return process
+
+    async def start(self) -> str:
+        ollama_port, api_port = free_port(), free_port()
+        self._spawn([
+            sys.executable, "-m", "benchmarks.stub_ollama", "--port", str(ollama_port),
+            "--first-token-ms", str(self.args.first_token_ms),
+            "--token-ms", str(self.args.token_ms),
+            "--tokens", str(self.args.tokens)
+        ])
+
+        env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(filter(None, [str(BACKEND_DIR), os.environ.get("PYTHONPATH")])),
+            OLLAMA_URL=f"http://127.0.0.1:{ollama_port}",
+            DATABASE_URL=self.args.database_url or f"sqlite:///{self.workdir / 'chat.db'}",
+            VECTOR_BACKEND=self.args.vector_backend,
+            ANSWER_CACHE_ENABLED=str(self.args.answer_cache).lower()
+        )
+        waits = [wait_until_up(f"http://127.0.0.1:{ollama_port}/api/tags")]
+        if self.args.vector_backend == "chroma":
+            chroma_port = free_port()
+            chroma = shutil.which("chroma") or str(Path(sys.executable).parent / "chroma")
+            self._spawn(
+                [chroma, "run", "--path", str(self.workdir / "chroma"), "--port", str(chroma_port)],
+                cwd=self.workdir
+            )
+            env["CHROMA_URL"] = f"http://127.0.0.1:{chroma_port}"
+            waits.append(wait_until_up(f"http://127.0.0.1:{chroma_port}/api/v1/heartbeat"))
+        await asyncio.gather(*waits)
+
+        (self.workdir / "uploads").mkdir()
+        self._spawn(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(api_port), "--log-level", "warning"],
+            env=env,
+            cwd=self.workdir
+        )
+        url = f"http://127.0.0.1:{api_port}"
+        await wait_until_up(f"{url}/", timeout=300.0)
+        return url
+
+    def stop(self):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self.args.keep_workdir:
+            print(f"Logs and data kept in {self.workdir}")
+        else:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+# Workload
+
+
+async def upload_documents(client: httpx.AsyncClient, recorder: Recorder, count: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    job_ids = []
+
+    async def upload(number: int):
+        async with semaphore:
+            started = time.perf_counter()
+            files = {"file": (f"load_client_{number:04d}.txt", synthetic_client_file(number).encode(), "text/plain")}
+            try:
+                response = await client.post("/api/v1/documents/upload", files=files)
+            except httpx.HTTPError:
+                recorder.record("POST /documents/upload", started)
+                return
+            recorder.record("POST /documents/upload", started, response)
+            if response.status_code == 202:
+                job_ids.append(response.json()["job_id"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(upload(number) for number in range(count)))
+
+    # Wait for indexing to finish; ingest time is queueing plus indexing
+    pending = set(job_ids)
+    ingest_seconds = []
+    while pending:
+        await asyncio.sleep(0.5)
+        for job_id in list(pending):
+            job = (await client.get(f"/api/v1/documents/jobs/{job_id}")).json()
+            if job["status"] in ("completed", "failed"):
+                pending.discard(job_id)
+                if job["status"] == "failed":
+                    recorder.errors["ingest"] += 1
+                elif job.get("finished_at") and job.get("created_at"):
+                    ingest_seconds.append(
+                        (datetime.fromisoformat(job["finished_at"]) - datetime.fromisoformat(job["created_at"])).total_seconds()
+                    )
+    recorder.endpoints["ingest (upload to indexed)"] = [seconds * 1000 for seconds in ingest_seconds]
+    elapsed = time.perf_counter() - started
+    return {"documents": len(job_ids), "seconds": round(elapsed, 2), "documents_per_second": round(len(job_ids) / elapsed, 2)}
+
+
+async def ask(client: httpx.AsyncClient, recorder: Recorder, session_id: int, question: str, stream: bool):
+    if not stream:
+        endpoint = "POST /chat/sessions/{id}/messages"
+        started = time.perf_counter()
+        try:
+            response = await client.post(f"/api/v1/chat/sessions/{session_id}/messages", json={"content": question})
+        except httpx.HTTPError:
+            recorder.record(endpoint, started)
+            return
+        recorder.record(endpoint, started, response)
+        return
+
+    endpoint = "POST /chat/sessions/{id}/messages/stream"
+    started = time.perf_counter()
+    try:
+        async with client.stream(
+            "POST", f"/api/v1/chat/sessions/{session_id}/messages/stream", json={"content": question}
+        ) as response:
+            first_token = None
+            failed = response.status_code >= 400
+            async for line in response.aiter_lines():
+                if line == "event: token" and first_token is None:
+                    first_token = (time.perf_counter() - started) * 1000
+                elif line == "event: error":
+                    failed = True
+            recorder.record(endpoint, started, None if failed else response)
+            if first_token is not None:
+                recorder.endpoints["stream time to first token"].append(first_token)
+    except httpx.HTTPError:
+        recorder.record(endpoint, started)
+
+
+async def replay_questions(client: httpx.AsyncClient, recorder: Recorder, args) -> dict:
+    questions = load_questions()
+    sessions = []
+    for i in range(args.concurrency):
+        response = await client.post("/api/v1/chat/sessions", json={"title": f"Load test {i}"})
+        response.raise_for_status()
+        sessions.append(response.json()["id"])
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(args.requests):
+        stream = args.mode == "stream" or (args.mode == "both" and i % 2)
+        queue.put_nowait((questions[i % len(questions)], stream))
+
+    async def worker(session_id: int):
+        while True:
+            try:
+                question, stream = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await ask(client, recorder, session_id, question, stream)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(session_id) for session_id in sessions))
+    elapsed = time.perf_counter() - started
+    return {"requests": args.requests, "seconds": round(elapsed, 2), "requests_per_second": round(args.requests / elapsed, 2)}
+
+
+# Reporting
+
+
+def summarize(recorder: Recorder, args, ingest: dict, chat: dict) -> dict:
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "mode": args.mode,
+            "uploads": args.uploads,
+            "vector_backend": args.vector_backend,
+            "answer_cache": args.answer_cache,
+            "ollama_stub": {"first_token_ms": args.first_token_ms, "token_ms": args.token_ms, "tokens": args.tokens}
+        },
+        "throughput": {"ingest": ingest, "chat": chat},
+        "endpoints": {
+            name: {**percentiles(samples), "errors": recorder.errors.get(name, 0)}
+            for name, samples in sorted(recorder.endpoints.items())
+        },
+        "stages": {name: percentiles(samples) for name, samples in sorted(recorder.stages.items())}
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict):
+    print(f"\nIngest: {results['throughput']['ingest']}")
+    print(f"Chat:   {results['throughput']['chat']}\n")
+    print(f"{'':48} {'count':>6} {'err':>4} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    for section in ("endpoints", "stages"):
+        for name, stats in results[section].items():
+            if stats["count"]:
+                label = name if section == "endpoints" else f"  stage: {name}"
+                print(
+                    f"{label:48} {stats['count']:>6} {stats.get('errors', 0):>4} "
+                    f"{stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f}"
+                )
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> bool:
+    """Print percentile changes against `baseline`; False if a p95 regressed too far"""
+    ok = True
+    print(f"\nCompared to baseline {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')}):")
+    for section in ("endpoints", "stages"):
+        for name, stats in results[section].items():
+            before = baseline.get(section, {}).get(name)
+            if not before or not before.get("count") or not stats.get("count"):
+                continue
+            changes = {pct: (stats[pct] - before[pct]) / before[pct] * 100 if before[pct] else 0.0 for pct in ("p50", "p95", "p99")}
+            # Sub-millisecond stages swing by large percentages on noise alone
+            regressed = changes["p95"] > max_regression and stats["p95"] - before["p95"] >= 1.0
+            ok = ok and not regressed
+            print(
+                f"  {name:46} p50 {changes['p50']:+6.1f}%  p95 {changes['p95']:+6.1f}%  p99 {changes['p99']:+6.1f}%"
+                + ("  REGRESSION" if regressed else "")
+            )
+    return ok
+
+
+async def run(args) -> dict:
+    stack = None
+    url = args.target
+    if url is None:
+        stack = Stack(args)
+        url = await stack.start()
+
+    recorder = Recorder()
+    try:
+        async with httpx.AsyncClient(base_url=url, timeout=args.timeout) as client:
+            ingest = await upload_documents(client, recorder, args.uploads, args.concurrency) if args.uploads else {}
+            chat = await replay_questions(client, recorder, args)
+    finally:
+        if stack is not None:
+            stack.stop()
+    return summarize(recorder, args, ingest, chat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the RAG Chat API")
+    parser.add_argument("--target", help="URL of a running API; by default a local stack is started")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="chat requests to send")
+    parser.add_argument("--mode", choices=["message", "stream", "both"], default="both")
+    parser.add_argument("--uploads", type=int, default=10, help="synthetic client files to ingest first")
+    parser.add_argument("--first-token-ms", type=float, default=150.0, help="stub Ollama processing delay for an uncached prompt")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="stub Ollama delay per generated token")
+    parser.add_argument("--tokens", type=int, default=80, help="stub Ollama tokens per answer")
+    parser.add_argument("--vector-backend", choices=["chroma", "local"], default="chroma")
+    parser.add_argument("--database-url", help="defaults to a SQLite file in the temporary directory")
+    parser.add_argument("--answer-cache", action="store_true", help="leave the semantic answer cache on")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="allowed p95 increase in percent")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Time turning a session's message rows into response bytes.
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization_benchmark --messages 1000 --sources 5
+
+Compares the ways GET /chat/sessions/{id}/messages has built its response,
+starting from rows already fetched:
+
+- text: sources stored as a JSON string, json.loads per row, then FastAPI
+  validating the response model and encoding it with the json module
+- json: sources column decoded by the driver, same FastAPI response path
+- fragment: plain rows with the sources JSON text spliced into an orjson
+  response unparsed (the current endpoint)
+
+The rows are synthetic, shaped like assistant answers with their sources.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.schemas import ChatMessageResponse
+
+_RESPONSE_FIELD = create_response_field(name="messages", type_=List[ChatMessageResponse])
+
+
+def make_rows(messages: int, sources: int) -> List[SimpleNamespace]:
+    started = datetime(2026, 1, 1)
+    rows = []
+    for i in range(messages):
+        assistant = i % 2 == 1
+        rows.append(SimpleNamespace(
+            id=i + 1,
+            session_id=1,
+            role="assistant" if assistant else "user",
+            content=("The claim rests on unpaid overtime under the employment contract. " * 6)
+            if assistant else f"Question {i} about the client's case?",
+            sources=json.dumps([
+                {
+                    "filename": f"client_{(i + s) % 50:03d}.pdf",
+                    "page": s + 1,
+                    "content": "Employer/Defendant: Acme Logistics. Case Type: Wage and hour. " * 4
+                }
+                for s in range(sources)
+            ]) if assistant else None,
+            created_at=started + timedelta(seconds=i)
+        ))
+    return rows
+
+
+async def render_text(rows: List[SimpleNamespace]) -> bytes:
+    messages = [
+        SimpleNamespace(**{**vars(row), "sources": json.loads(row.sources) if row.sources else None})
+        for row in rows
+    ]
+    content = await serialize_response(field=_RESPONSE_FIELD, response_content=messages, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def render_json(rows: List[SimpleNamespace]) -> bytes:
+    content = await serialize_response(field=_RESPONSE_FIELD, response_content=rows, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def render_fragment(rows: List[SimpleNamespace]) -> bytes:
+    return ORJSONResponse([
+        {
+            "id": row.id,
+            "session_id": row.session_id,
+            "role": row.role,
+            "content": row.content,
+            "sources": orjson.Fragment(row.sources) if row.sources else None,
+            "created_at": row.created_at
+        }
+        for row in rows
+    ]).body
+
+
+async def time_render(render, rows, repeat: int) -> List[float]:
+    await render(rows)  # Warm up
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await render(rows)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def run(args):
+    text_rows = make_rows(args.messages, args.sources)
+    json_rows = [
+        SimpleNamespace(**{**vars(row), "sources": json.loads(row.sources) if row.sources else None})
+        for row in text_rows
+    ]
+
+    # Same response body whichever way it is built
+    bodies = {
+        "text": await render_text(text_rows),
+        "json": await render_json(json_rows),
+        "fragment": await render_fragment(text_rows)
+    }
+    decoded = {name: json.loads(body) for name, body in bodies.items()}
+    assert decoded["text"] == decoded["json"] == decoded["fragment"], "renderings differ"
+
+    print(f"{args.messages} messages, {args.sources} sources per answer, {len(bodies['fragment']) / 1024:.0f} KiB")
+    print(f"{'':10}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>10}")
+    baseline = None
+    for name, render, rows in (
+        ("text", render_text, text_rows),
+        ("json", render_json, json_rows),
+        ("fragment", render_fragment, text_rows)
+    ):
+        samples = sorted(await time_render(render, rows, args.repeat))
+        p50 = statistics.median(samples)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        baseline = baseline or p50
+        print(f"{name:10}{p50:10.2f}{p95:10.2f}{baseline / p50:9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--sources", type=int, default=5, help="sources per assistant message")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
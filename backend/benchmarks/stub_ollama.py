@@ -0,0 +1,128 @@
+"""Stand-in for the Ollama API with a configurable generation speed.
+
+Serves `/api/generate` and `/api/chat` (streaming NDJSON and single
+response) and `/api/tags`, replying with filler tokens after a
+prompt-processing delay and a fixed delay per token, so load tests measure
+the API rather than a model. Like Ollama, it remembers the last prompts
+of a few slots and only charges the prompt delay for the part after the
+longest prefix shared with one of them:
+
+    python -m benchmarks.stub_ollama --port 11500 --first-token-ms 150 --token-ms 20 --tokens 80
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+_WORDS = "the client contract claim damages court filed statute employer notice".split()
+
+
+class _PromptCache:
+    """Prompts last processed by each of Ollama's parallel slots"""
+
+    def __init__(self, slots: int = 4):
+        self.slots = [""] * slots
+
+    def process(self, prompt: str) -> float:
+        """Fraction of `prompt` that is not cached, moving it into a slot"""
+        best, shared = 0, -1
+        for i, cached in enumerate(self.slots):
+            length = len(os.path.commonprefix([cached, prompt]))
+            if length > shared:
+                best, shared = i, length
+        # A slot the prompt extends is reused in place. Otherwise the shared
+        # prefix is copied into the least recently used slot, so the best
+        # match stays cached for the conversation it belongs to.
+        self.slots.pop(best if shared == len(self.slots[best]) else 0)
+        self.slots.append(prompt)
+        return (len(prompt) - shared) / max(len(prompt), 1)
+
+
+def create_app(first_token_ms: float = 150.0, token_ms: float = 20.0, tokens: int = 80) -> FastAPI:
+    app = FastAPI(title="Ollama stub")
+    cache = _PromptCache()
+
+    def token(i: int) -> str:
+        return _WORDS[i % len(_WORDS)] + " "
+
+    def prompt_of(body: dict) -> str:
+        if "messages" in body:
+            return "".join(f"<{m['role']}>{m['content']}" for m in body["messages"])
+        return body.get("prompt", "")
+
+    def final(body: dict, started: float, evaluated: int, text: str = "") -> dict:
+        result = {
+            "model": body.get("model", "stub"),
+            "done": True,
+            "prompt_eval_count": evaluated,
+            "eval_count": tokens,
+            "total_duration": int((time.perf_counter() - started) * 1e9)
+        }
+        if "messages" in body:
+            result["message"] = {"role": "assistant", "content": text}
+        else:
+            result["response"] = text
+        return result
+
+    def chunk(body: dict, text: str) -> str:
+        if "messages" in body:
+            return json.dumps({"message": {"role": "assistant", "content": text}, "done": False}) + "\n"
+        return json.dumps({"response": text, "done": False}) + "\n"
+
+    async def respond(body: dict):
+        started = time.perf_counter()
+        prompt = prompt_of(body)
+        uncached = cache.process(prompt)
+        evaluated = int(len(prompt) * uncached) // 4
+        prompt_ms = first_token_ms * uncached
+
+        if not body.get("stream", True):
+            await asyncio.sleep((prompt_ms + token_ms * tokens) / 1000)
+            return final(body, started, evaluated, "".join(token(i) for i in range(tokens)))
+
+        async def stream():
+            await asyncio.sleep(prompt_ms / 1000)
+            for i in range(tokens):
+                if i:
+                    await asyncio.sleep(token_ms / 1000)
+                yield chunk(body, token(i))
+            yield json.dumps(final(body, started, evaluated)) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "stub"}]}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        return await respond(await request.json())
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        return await respond(await request.json())
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Ollama API stub for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--first-token-ms", type=float, default=150.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--tokens", type=int, default=80)
+    args = parser.parse_args()
+
+    app = create_app(args.first_token_ms, args.token_ms, args.tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Compare the Chroma HTTP and local vector store backends on the same corpus.
+
+Run from the backend directory, with the ChromaDB server reachable at
+CHROMA_URL for the "chroma" backend:
+
+    python -m benchmarks.vector_store_benchmark --chunks 20000 --queries 500
+
+The corpus is synthetic: random unit vectors shaped like the default
+embedding model's (384 dimensions), with client-style metadata so the
+filtered queries exercise the same `where` clauses as entity routing. Each
+backend gets a throwaway collection that is removed afterwards.
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from app.services.local_vector_store import LocalVectorStore
+from app.services.vector_store import ChromaVectorStore, VectorStore
+
+
+def make_corpus(chunks: int, dim: int, clients: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(chunks, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [uuid.uuid4().hex for _ in range(chunks)]
+    metadatas = [
+        {"filename": f"client_{i % clients:04d}.pdf", "client_id": f"LAW-{i % clients:04d}", "page": i % 7}
+        for i in range(chunks)
+    ]
+    documents = [f"Synthetic chunk {i} for client LAW-{i % clients:04d}" for i in range(chunks)]
+    queries = rng.normal(size=(256, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return ids, vectors, metadatas, documents, queries
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def time_queries(store: VectorStore, queries: np.ndarray, count: int, k: int, clients: int, filtered: bool) -> dict:
+    latencies = []
+    for i in range(count):
+        where = {"client_id": f"LAW-{i % clients:04d}"} if filtered else None
+        started = time.perf_counter()
+        store.query(queries[i % len(queries)], k, where)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "qps": round(count / (sum(latencies) / 1000), 1)
+    }
+
+
+def run(store: VectorStore, corpus, args) -> dict:
+    ids, vectors, metadatas, documents, queries = corpus
+    started = time.perf_counter()
+    for start in range(0, len(ids), args.batch_size):
+        stop = start + args.batch_size
+        store.upsert(ids[start:stop], vectors[start:stop].tolist(), metadatas[start:stop], documents[start:stop])
+    upsert_seconds = time.perf_counter() - started
+
+    # One untimed query so lazy index builds don't land in the percentiles
+    store.query(queries[0], args.k)
+    return {
+        "upsert_chunks_per_second": round(len(ids) / upsert_seconds, 1),
+        "query": time_queries(store, queries, args.queries, args.k, args.clients, filtered=False),
+        "filtered_query": time_queries(store, queries, args.queries, args.k, args.clients, filtered=True)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--backends", default="chroma,local")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.chunks, args.dim, args.clients)
+    collection = f"benchmark_{uuid.uuid4().hex[:8]}"
+    results = {}
+
+    for backend in args.backends.split(","):
+        if backend == "chroma":
+            store = ChromaVectorStore(embeddings=None, collection_name=collection)
+            try:
+                results[backend] = run(store, corpus, args)
+            finally:
+                store.client.delete_collection(collection)
+                store.close()
+        elif backend == "local":
+            directory = tempfile.mkdtemp(prefix="vector_store_benchmark_")
+            try:
+                results[backend] = run(LocalVectorStore(embeddings=None, directory=directory), corpus, args)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        else:
+            raise SystemExit(f"Unknown backend: {backend}")
+
+    print(f"{args.chunks} chunks, {args.dim} dims, k={args.k}, {args.queries} queries per mode")
+    for backend, result in results.items():
+        print(
+            f"{backend:>6}: upsert {result['upsert_chunks_per_second']:>9.1f} chunks/s | "
+            f"query p50 {result['query']['p50_ms']:.2f} ms p95 {result['query']['p95_ms']:.2f} ms | "
+            f"filtered p50 {result['filtered_query']['p50_ms']:.2f} ms p95 {result['filtered_query']['p95_ms']:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
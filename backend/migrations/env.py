@@ -0,0 +1,50 @@
+from logging.config import fileConfig
+import asyncio
+
+from alembic import context
+
+from app.core.config import settings
+from app.core.database import Base, engine
+
+config = context.config
+
+# init_db passes its own connection; the app has configured logging already
+connection = config.attributes.get("connection")
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+
+def _configure(**kwargs):
+    context.configure(
+        target_metadata=Base.metadata,
+        # SQLite can't ALTER most things; batch mode recreates the table instead
+        render_as_batch=True,
+        **kwargs
+    )
+
+
+def run_migrations_offline():
+    """Emit the migration SQL without connecting (`alembic upgrade head --sql`)"""
+    _configure(url=settings.database_url, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(sync_connection):
+    _configure(connection=sync_connection)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def _run_async():
+    async with engine.begin() as async_connection:
+        await async_connection.run_sync(_run)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif connection is not None:
+    _run(connection)
+else:
+    asyncio.run(_run_async())
@@ -0,0 +1,63 @@
+"""Baseline: the chat tables as create_all made them
+
+Databases created before migrations existed already have these tables,
+so each one is only created when missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Offline (--sql) there is no database to look at; emit everything
+    if op.get_context().as_sql:
+        existing = set()
+    else:
+        existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "chat_sessions" not in existing:
+        op.create_table(
+            "chat_sessions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(255), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime())
+        )
+        op.create_index("ix_chat_sessions_id", "chat_sessions", ["id"])
+
+    if "chat_messages" not in existing:
+        op.create_table(
+            "chat_messages",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("session_id", sa.Integer(), nullable=False),
+            sa.Column("role", sa.String(50), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("sources", sa.Text()),
+            sa.Column("created_at", sa.DateTime())
+        )
+        op.create_index("ix_chat_messages_id", "chat_messages", ["id"])
+        op.create_index("ix_chat_messages_session_id", "chat_messages", ["session_id"])
+
+    if "chat_session_summaries" not in existing:
+        op.create_table(
+            "chat_session_summaries",
+            sa.Column("session_id", sa.Integer(), primary_key=True),
+            sa.Column("summary", sa.Text(), nullable=False),
+            sa.Column("summarized_through", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime())
+        )
+
+
+def downgrade():
+    op.drop_table("chat_session_summaries")
+    op.drop_table("chat_messages")
+    op.drop_table("chat_sessions")
@@ -0,0 +1,32 @@
+"""Composite indexes for keyset pagination of sessions and messages
+
+The (session_id, created_at, id) index also serves lookups by session_id
+alone, so the single-column index it replaces is dropped.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_chat_sessions_created_at_id", "chat_sessions", ["created_at", "id"])
+    op.create_index(
+        "ix_chat_messages_session_id_created_at_id",
+        "chat_messages",
+        ["session_id", "created_at", "id"]
+    )
+    op.drop_index("ix_chat_messages_session_id", table_name="chat_messages")
+
+
+def downgrade():
+    op.create_index("ix_chat_messages_session_id", "chat_messages", ["session_id"])
+    op.drop_index("ix_chat_messages_session_id_created_at_id", table_name="chat_messages")
+    op.drop_index("ix_chat_sessions_created_at_id", table_name="chat_sessions")
@@ -0,0 +1,49 @@
+"""Store message sources as JSON (JSONB on PostgreSQL) instead of text
+
+Existing values were written with json.dumps, so PostgreSQL converts them
+in place with a cast. SQLite keeps JSON as text either way; its table is
+rebuilt only to record the new column type.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        op.alter_column(
+            "chat_messages",
+            "sources",
+            type_=JSONB(),
+            existing_type=sa.Text(),
+            postgresql_using="NULLIF(sources, '')::jsonb"
+        )
+        return
+
+    with op.batch_alter_table("chat_messages") as batch:
+        batch.alter_column("sources", type_=sa.JSON(), existing_type=sa.Text())
+
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        op.alter_column(
+            "chat_messages",
+            "sources",
+            type_=sa.Text(),
+            existing_type=JSONB(),
+            postgresql_using="sources::text"
+        )
+        return
+
+    with op.batch_alter_table("chat_messages") as batch:
+        batch.alter_column("sources", type_=sa.Text(), existing_type=sa.JSON())
@@ -0,0 +1,44 @@
+"""Catalog of uploaded documents
+
+One row per file with its size, page and chunk counts and indexing status,
+so listing documents no longer reads every chunk of the vector store. It is
+filled from the vector store on the first startup after this migration.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "documents",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=True),
+        sa.Column("pages", sa.Integer(), nullable=True),
+        sa.Column("chunks", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("indexed_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("filename")
+    )
+    op.create_index("ix_documents_content_hash", "documents", ["content_hash"])
+    op.create_index("ix_documents_created_at_id", "documents", ["created_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_documents_created_at_id", table_name="documents")
+    op.drop_index("ix_documents_content_hash", table_name="documents")
+    op.drop_table("documents")
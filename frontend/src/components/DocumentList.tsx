@@ -12,6 +12,8 @@ export const DocumentList: React.FC<DocumentListProps> = ({ onDocumentChange })
   const [documents, setDocuments] = useState<Document[]>([]);
   const [loading, setLoading] = useState(true);
   const [deleting, setDeleting] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     loadDocuments();
@@ -19,8 +21,9 @@ export const DocumentList: React.FC<DocumentListProps> = ({ onDocumentChange })
 
   const loadDocuments = async () => {
     try {
-      const data = await apiService.getDocuments();
-      setDocuments(data);
+      const page = await apiService.getDocuments();
+      setDocuments(page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error loading documents:', error);
     } finally {
@@ -28,6 +31,20 @@ export const DocumentList: React.FC<DocumentListProps> = ({ onDocumentChange })
     }
   };
 
+  const loadMoreDocuments = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await apiService.getDocuments(nextCursor);
+      setDocuments(prev => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error loading documents:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDeleteDocument = async (filename: string) => {
     if (!window.confirm(`Delete "${filename}"? This will remove it from the vector database.`)) {
       return;
@@ -64,7 +81,7 @@ export const DocumentList: React.FC<DocumentListProps> = ({ onDocumentChange })
     <div className="bg-white rounded-lg border border-rag-border p-6">
       <h3 className="text-lg font-semibold text-gray-900 mb-4 flex items-center gap-2">
         <DocumentIcon className="w-5 h-5 text-rag-primary" />
-        Document Library ({documents.length})
+        Document Library ({documents.length}{nextCursor ? '+' : ''})
       </h3>
       
       {documents.length === 0 ? (
@@ -93,8 +110,16 @@ export const DocumentList: React.FC<DocumentListProps> = ({ onDocumentChange })
                       <CalendarIcon className="w-3 h-3" />
                       {formatDistanceToNow(new Date(doc.upload_date), { addSuffix: true })}
                     </span>
-                    <span>{doc.pages} pages</span>
+                    {doc.pages !== null && <span>{doc.pages} pages</span>}
                     <span>{doc.size_mb.toFixed(1)} MB</span>
+                    {doc.status !== 'indexed' && (
+                      <span
+                        className={doc.status === 'failed' ? 'text-red-500' : 'text-rag-primary'}
+                        title={doc.error ?? undefined}
+                      >
+                        {doc.status}
+                      </span>
+                    )}
                   </div>
                 </div>
               </div>
@@ -113,6 +138,16 @@ export const DocumentList: React.FC<DocumentListProps> = ({ onDocumentChange })
               </button>
             </div>
           ))}
+
+          {nextCursor && (
+            <button
+              onClick={loadMoreDocuments}
+              disabled={loadingMore}
+              className="w-full px-3 py-2 text-sm text-rag-secondary hover:text-rag-primary hover:bg-gray-50 rounded-lg transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load More'}
+            </button>
+          )}
         </div>
       )}
     </div>
@@ -34,8 +34,19 @@ export const DocumentUpload: React.FC<DocumentUploadProps> = ({ onUploadComplete
     setUploadResult(null);
 
     try {
-      const result = await apiService.uploadDocument(file);
-      setUploadResult(`✅ ${result.message}`);
+      const upload = await apiService.uploadDocument(file);
+
+      // Indexing runs in the background; poll until the job finishes
+      let job = await apiService.getIngestionJob(upload.job_id);
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        job = await apiService.getIngestionJob(upload.job_id);
+      }
+
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Indexing failed');
+      }
+      setUploadResult(`✅ ${job.message}`);
       onUploadComplete();
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Upload failed');
@@ -21,27 +21,25 @@ export const Sidebar: React.FC<SidebarProps> = ({
 }) => {
   const [sessions, setSessions] = useState<ChatSession[]>([]);
   const [loading, setLoading] = useState(true);
-  const [currentPage, setCurrentPage] = useState(1);
-  const [hasMoreSessions, setHasMoreSessions] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const PAGE_SIZE = 20;
 
   useEffect(() => {
     loadSessions();
   }, []);
 
-  const loadSessions = async (page: number = 1, append: boolean = false) => {
+  const loadSessions = async (cursor: string | null = null, append: boolean = false) => {
     try {
       if (!append) setLoading(true);
-      const data = await apiService.getChatSessions(page, PAGE_SIZE);
+      const page = await apiService.getChatSessions(cursor, PAGE_SIZE);
 
       if (append) {
-        setSessions(prev => [...prev, ...data]);
+        setSessions(prev => [...prev, ...page.items]);
       } else {
-        setSessions(data);
+        setSessions(page.items);
       }
 
-      setHasMoreSessions(data.length === PAGE_SIZE);
-      setCurrentPage(page);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error loading sessions:', error);
     } finally {
@@ -69,13 +67,12 @@ export const Sidebar: React.FC<SidebarProps> = ({
   };
 
   const refreshSessions = () => {
-    setCurrentPage(1);
-    loadSessions(1, false);
+    loadSessions(null, false);
   };
 
   const loadMoreSessions = () => {
-    if (hasMoreSessions && !loading) {
-      loadSessions(currentPage + 1, true);
+    if (nextCursor && !loading) {
+      loadSessions(nextCursor, true);
     }
   };
 
@@ -151,7 +148,7 @@ export const Sidebar: React.FC<SidebarProps> = ({
             ))}
 
             {/* Load More Button */}
-            {hasMoreSessions && (
+            {nextCursor && (
               <div className="p-2">
                 <button
                   onClick={loadMoreSessions}
@@ -17,6 +17,8 @@ export const ChatPage: React.FC<ChatPageProps> = ({ sessionId, onSessionCreated
   const [loading, setLoading] = useState(false);
   const [sending, setSending] = useState(false);
   const [showDocuments, setShowDocuments] = useState(false);
+  const [earlierCursor, setEarlierCursor] = useState<string | null>(null);
+  const [loadingEarlier, setLoadingEarlier] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
@@ -24,6 +26,7 @@ export const ChatPage: React.FC<ChatPageProps> = ({ sessionId, onSessionCreated
       loadMessages();
     } else {
       setMessages([]);
+      setEarlierCursor(null);
     }
   }, [sessionId]);
 
@@ -40,8 +43,9 @@ export const ChatPage: React.FC<ChatPageProps> = ({ sessionId, onSessionCreated
     
     setLoading(true);
     try {
-      const data = await apiService.getChatMessages(sessionId);
-      setMessages(data);
+      const page = await apiService.getChatMessages(sessionId);
+      setMessages(page.items);
+      setEarlierCursor(page.nextCursor);
     } catch (error) {
       console.error('Error loading messages:', error);
     } finally {
@@ -49,6 +53,21 @@ export const ChatPage: React.FC<ChatPageProps> = ({ sessionId, onSessionCreated
     }
   };
 
+  const loadEarlierMessages = async () => {
+    if (!sessionId || !earlierCursor) return;
+
+    setLoadingEarlier(true);
+    try {
+      const page = await apiService.getChatMessages(sessionId, earlierCursor);
+      setMessages(prev => [...page.items, ...prev]);
+      setEarlierCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error loading earlier messages:', error);
+    } finally {
+      setLoadingEarlier(false);
+    }
+  };
+
   const handleSendMessage = async (content: string) => {
     setSending(true);
     
@@ -141,6 +160,17 @@ export const ChatPage: React.FC<ChatPageProps> = ({ sessionId, onSessionCreated
               </div>
             ) : (
               <div>
+                {earlierCursor && (
+                  <div className="flex justify-center p-4">
+                    <button
+                      onClick={loadEarlierMessages}
+                      disabled={loadingEarlier}
+                      className="px-3 py-2 text-sm text-rag-secondary hover:text-rag-primary hover:bg-gray-50 rounded-lg transition-colors disabled:opacity-50"
+                    >
+                      {loadingEarlier ? 'Loading...' : 'Load earlier messages'}
+                    </button>
+                  </div>
+                )}
                 {messages.map((message) => (
                   <ChatMessage key={message.id} message={message} />
                 ))}
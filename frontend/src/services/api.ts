@@ -1,9 +1,9 @@
-import { ChatSession, ChatMessage, Document, HealthStatus } from '../types';
+import { ChatSession, ChatMessage, Document, HealthStatus, IngestionJob, Page } from '../types';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8001';
 
 class ApiService {
-  private async request<T>(endpoint: string, options?: RequestInit): Promise<T> {
+  private async fetchOk(endpoint: string, options?: RequestInit): Promise<Response> {
     const response = await fetch(`${API_BASE_URL}${endpoint}`, {
       headers: {
         'Content-Type': 'application/json',
@@ -17,9 +17,23 @@ class ApiService {
       throw new Error(`API Error: ${response.status} - ${error}`);
     }
 
+    return response;
+  }
+
+  private async request<T>(endpoint: string, options?: RequestInit): Promise<T> {
+    const response = await this.fetchOk(endpoint, options);
     return response.json();
   }
 
+  // Keyset-paginated lists send the next page's cursor in a header
+  private async requestPage<T>(endpoint: string): Promise<Page<T>> {
+    const response = await this.fetchOk(endpoint);
+    return {
+      items: await response.json(),
+      nextCursor: response.headers.get('X-Next-Cursor'),
+    };
+  }
+
   // Health endpoints
   async getHealth(): Promise<HealthStatus> {
     return this.request<HealthStatus>('/api/v1/health');
@@ -33,12 +47,15 @@ class ApiService {
     });
   }
 
-  async getChatSessions(page: number = 1, pageSize: number = 20): Promise<ChatSession[]> {
-    return this.request<ChatSession[]>(`/api/v1/chat/sessions?page=${page}&page_size=${pageSize}`);
+  async getChatSessions(cursor: string | null = null, pageSize: number = 20): Promise<Page<ChatSession>> {
+    const after = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+    return this.requestPage<ChatSession>(`/api/v1/chat/sessions?page_size=${pageSize}${after}`);
   }
 
-  async getChatMessages(sessionId: number): Promise<ChatMessage[]> {
-    return this.request<ChatMessage[]>(`/api/v1/chat/sessions/${sessionId}/messages`);
+  // Latest messages first; the cursor pages back to earlier ones
+  async getChatMessages(sessionId: number, cursor: string | null = null): Promise<Page<ChatMessage>> {
+    const before = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    return this.requestPage<ChatMessage>(`/api/v1/chat/sessions/${sessionId}/messages${before}`);
   }
 
   async sendMessage(sessionId: number, content: string): Promise<ChatMessage> {
@@ -55,7 +72,7 @@ class ApiService {
   }
 
   // Document endpoints
-  async uploadDocument(file: File): Promise<{ filename: string; pages: number; message: string }> {
+  async uploadDocument(file: File): Promise<{ filename: string; message: string; job_id: string; status: string }> {
     const formData = new FormData();
     formData.append('file', file);
 
@@ -72,8 +89,13 @@ class ApiService {
     return response.json();
   }
 
-  async getDocuments(): Promise<Document[]> {
-    return this.request<Document[]>('/api/v1/documents');
+  async getIngestionJob(jobId: string): Promise<IngestionJob> {
+    return this.request<IngestionJob>(`/api/v1/documents/jobs/${jobId}`);
+  }
+
+  async getDocuments(cursor: string | null = null, pageSize: number = 50): Promise<Page<Document>> {
+    const after = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+    return this.requestPage<Document>(`/api/v1/documents?page_size=${pageSize}${after}`);
   }
 
   async deleteDocument(filename: string): Promise<void> {
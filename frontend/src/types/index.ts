@@ -1,3 +1,8 @@
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
 export interface ChatSession {
   id: number;
   title: string;
@@ -23,8 +28,27 @@ export interface ChatMessage {
 export interface Document {
   filename: string;
   upload_date: string;
-  pages: number;
+  pages: number | null;
   size_mb: number;
+  chunks: number;
+  status: 'queued' | 'indexing' | 'indexed' | 'failed';
+  error: string | null;
+}
+
+export interface IngestionJob {
+  job_id: string;
+  filename: string;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  stage: string;
+  total_pages: number | null;
+  pages_processed: number;
+  total_chunks: number | null;
+  chunks_processed: number;
+  message: string | null;
+  error: string | null;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
 }
 
 export interface HealthStatus {